@@ -30,7 +30,7 @@ from roofhelper.cityjson.geluid import (GELUID_SCHEMA, HOOGTE_SCHEMA,
                                         read_height_from_cityjson)
 from roofhelper.io import SchemeFileHandler, download_if_not_exists
 from roofhelper.kadaster import bag
-from roofhelper.kadaster.geo import grid_create_on_intersecting_centroid
+from roofhelper.kadaster.geo import centroid_in_extent, grid_create_on_intersecting_centroid
 from roofhelper.pdok import PdokS3Uploader, PdokUpdateTrigger, UploadResult
 from roofhelper.pdok.PdokDeliverySound import PDOK_DELIVERY_SCHEMA_SOUND, get_pdok_sound_features
 from roofhelper.pdok.PdokGeopackageWriter import write_features_to_geopackage
@@ -136,7 +136,7 @@ def runsingleroofertile(extent: tuple[float, float, float, float],
 
     # All building centroids that intersect with the rectangle will participate with the roofer config
     # This will prevent buildings being present in multiple roofer configs
-    building_footprints_filtered = building_footprints[building_footprints.centroid.within(box(*extent))]
+    building_footprints_filtered = building_footprints[centroid_in_extent(building_footprints.geometry.values, extent)]
     # Use the total bounds of the selected buildings to figure out which laz files participate
     minx, miny, maxx, maxy = building_footprints_filtered.total_bounds
     filtered_extent_box = box(minx, miny, maxx, maxy)
@@ -4,7 +4,7 @@ from typing import Optional
 import os
 
 
-@dataclass
+@dataclass(slots=True)
 class EntryProperties:
     """
     Properties of a file or directory entry across different storage systems.
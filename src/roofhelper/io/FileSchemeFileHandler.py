@@ -30,6 +30,20 @@ class FileSchemeFileHandler(AbstractSchemeHandler):
             raise FileNotFoundError(f"File not found: {file_path}")
         return FileHandle(file_path, False)
 
+    @staticmethod
+    def _entry_from_dirent(dirent: os.DirEntry[str], relative_path: str) -> EntryProperties:
+        """ Builds the EntryProperties for a scandir entry, reuses the file type and stat information cached by the DirEntry """
+        is_file = dirent.is_file()
+        stat_info = dirent.stat()
+        return EntryProperties(
+            name=dirent.name,
+            full_uri="file://" + dirent.path,
+            path=relative_path,
+            is_file=is_file,
+            size=stat_info.st_size if is_file else None,  # Directories don't have a meaningful size
+            last_modified=datetime.fromtimestamp(stat_info.st_mtime),
+        )
+
     @staticmethod
     def _list_files_impl(uri: str, regex: Optional[str] = None, recursive: bool = False) -> Generator[EntryProperties, None, None]:
         """
@@ -44,66 +58,38 @@ class FileSchemeFileHandler(AbstractSchemeHandler):
         if not os.path.isdir(path):
             raise ValueError(f"The provided uri '{uri}' is not a valid directory.")
 
+        pattern = re.compile(regex) if regex is not None else None
+
         if recursive:
-            for root, dirs, files in os.walk(path):
-                # Yield directories first
-                for dir_name in dirs:
-                    full_path = os.path.join(root, dir_name)
-                    relative_path = os.path.relpath(full_path, path)
-                    stat_info = os.stat(full_path)
-
-                    if regex is not None:
-                        if not re.match(regex, full_path):
-                            continue
-
-                    entry = EntryProperties(
-                        name=dir_name,
-                        full_uri="file://" + full_path,
-                        path=relative_path,
-                        is_file=False,
-                        size=None,  # Directories don't have a meaningful size
-                        last_modified=datetime.fromtimestamp(stat_info.st_mtime),
-                    )
-                    yield entry
-
-                # Then yield files
-                for file in files:
-                    full_path = os.path.join(root, file)
-                    relative_path = os.path.relpath(full_path, path)
-                    stat_info = os.stat(full_path)
-
-                    if regex is not None:
-                        if not re.match(regex, full_path):
-                            continue
-
-                    entry = EntryProperties(
-                        name=file,
-                        full_uri="file://" + full_path,
-                        path=relative_path,
-                        is_file=True,
-                        size=stat_info.st_size,
-                        last_modified=datetime.fromtimestamp(stat_info.st_mtime),
-                    )
-                    yield entry
-        else:
-            for entry_name in os.listdir(path):
-                full_path = os.path.join(path, entry_name)
-                stat_info = os.stat(full_path)
-                is_file = os.path.isfile(full_path)
+            # Same top-down order as os.walk, but based on scandir so the file type and stat are only retrieved once per entry
+            pending: list[str] = [str(path)]
+            while pending:
+                root = pending.pop()
+                try:
+                    with os.scandir(root) as iterator:
+                        dirents = list(iterator)
+                except OSError:
+                    continue  # os.walk silently skips unreadable directories as well
+
+                directories = [dirent for dirent in dirents if dirent.is_dir()]
+                files = [dirent for dirent in dirents if not dirent.is_dir()]
+
+                # Yield directories first, then files
+                for dirent in directories + files:
+                    if pattern is not None and not pattern.match(dirent.path):
+                        continue
+
+                    yield FileSchemeFileHandler._entry_from_dirent(dirent, os.path.relpath(dirent.path, path))
 
-                if regex is not None:
-                    if not re.match(regex, full_path):
+                # Like os.walk, symlinked directories are listed but not followed
+                pending.extend(reversed([dirent.path for dirent in directories if not dirent.is_symlink()]))
+        else:
+            with os.scandir(path) as iterator:
+                for dirent in iterator:
+                    if pattern is not None and not pattern.match(dirent.path):
                         continue
 
-                entry_props = EntryProperties(
-                    name=entry_name,
-                    full_uri="file://" + full_path,
-                    path=entry_name,
-                    is_file=is_file,
-                    size=stat_info.st_size if is_file else None,
-                    last_modified=datetime.fromtimestamp(stat_info.st_mtime),
-                )
-                yield entry_props
+                    yield FileSchemeFileHandler._entry_from_dirent(dirent, dirent.name)
 
     @staticmethod
     def list_entries_shallow(uri: str, regex: Optional[str] = None) -> Generator[EntryProperties]:
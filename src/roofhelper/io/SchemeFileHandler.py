@@ -1,4 +1,6 @@
 # Currently not https://datatracker.ietf.org/doc/html/rfc3986/ compliant, should improve on it later.
+import functools
+import glob
 import os
 from pathlib import Path
 import tempfile
@@ -13,6 +15,30 @@ from .FileSchemeFileHandler import FileSchemeFileHandler
 from .EntryProperties import EntryProperties
 
 
+@functools.lru_cache(maxsize=512)
+def _scheme_of(uri: str) -> str:
+    """ Extract the scheme of an uri, cached because the same uri is often dispatched many times in a row """
+    return urlparse(uri).scheme
+
+
+@functools.lru_cache(maxsize=256)
+def _globs_to_regex(globs: tuple[str, ...]) -> str:
+    """
+    Combine glob patterns into a single regex, the globs are matched against the last path component
+    so '*.laz' matches 'file:///data/2022/tile.laz' but 'tile*' does not match 'file:///data/tile/other.txt'
+    """
+    alternatives = "|".join(glob.translate(pattern, include_hidden=True, seps="/") for pattern in globs)
+    return f"(?:.*/)?(?:{alternatives})"
+
+
+def _listing_regex(regex: str, include_globs: Optional[list[str]]) -> str:
+    if include_globs is None:
+        return regex
+    if regex:
+        raise ValueError("Specify either regex or include_globs, not both")
+    return _globs_to_regex(tuple(include_globs))
+
+
 class SchemeFileHandler:
     def __init__(self, temporary_directory: Optional[Path] = None) -> None:
         self.file_handles: list[FileHandle] = []
@@ -21,43 +47,43 @@ class SchemeFileHandler:
         self.temporary_directory = temporary_directory
         self._lock = threading.Lock()
 
+    def _handler_for(self, uri: str) -> type[AbstractSchemeHandler]:
+        """ Returns the scheme handler class responsible for the uri """
+        return self.scheme_handlers[_scheme_of(uri)]
+
     def download_file(self, uri: str, file: Optional[str] = None) -> Path:
-        parsed_uri = urlparse(uri)
-        handle: FileHandle = self.scheme_handlers[parsed_uri.scheme].download_file(uri, self.temporary_directory, file)
+        handle: FileHandle = self._handler_for(uri).download_file(uri, self.temporary_directory, file)
         self.file_handles.append(handle)
         return handle.path
 
-    def list_entries_shallow(self, uri: str, regex: str = '') -> Generator[EntryProperties]:
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].list_entries_shallow(uri, regex)
+    def list_entries_shallow(self, uri: str, regex: str = '', include_globs: Optional[list[str]] = None) -> Generator[EntryProperties]:
+        """
+        List the entries directly under the uri, optionally filtered by a regex or a list of globs (e.g. ['*.laz', '*.las']).
+        The globs are compiled into one regex, so every entry is matched once no matter how many globs are given.
+        """
+        return self._handler_for(uri).list_entries_shallow(uri, _listing_regex(regex, include_globs))
 
-    def list_entries_recursive(self, uri: str, regex: str = '') -> Generator[EntryProperties]:
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].list_entries_recursive(uri, regex)
+    def list_entries_recursive(self, uri: str, regex: str = '', include_globs: Optional[list[str]] = None) -> Generator[EntryProperties]:
+        """ Same as list_entries_shallow, but lists all entries in all subdirectories """
+        return self._handler_for(uri).list_entries_recursive(uri, _listing_regex(regex, include_globs))
 
     def upload_file_directory(self, file: Path, uri: str, filename: Optional[str] = None) -> None:
-        parsed_uri = urlparse(uri)
-        self.scheme_handlers[parsed_uri.scheme].upload_file_directory(file, uri, filename)
+        self._handler_for(uri).upload_file_directory(file, uri, filename)
 
     def upload_file_direct(self, file: Path, uri: str) -> None:
-        parsed_uri = urlparse(uri)
-        self.scheme_handlers[parsed_uri.scheme].upload_file_direct(file, uri)
+        self._handler_for(uri).upload_file_direct(file, uri)
 
     def upload_bytes_direct(self, stream: BinaryIO, uri: str) -> None:
-        parsed_uri = urlparse(uri)
-        self.scheme_handlers[parsed_uri.scheme].upload_stream_direct(stream, uri)
+        self._handler_for(uri).upload_stream_direct(stream, uri)
 
     def upload_bytes_directory(self, stream: BinaryIO, uri: str, filename: str) -> None:
-        parsed_uri = urlparse(uri)
-        self.scheme_handlers[parsed_uri.scheme].upload_stream_directory(stream, uri, filename)
+        self._handler_for(uri).upload_stream_directory(stream, uri, filename)
 
     def get_bytes(self, uri: str) -> bytes:
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].get_bytes(uri)
+        return self._handler_for(uri).get_bytes(uri)
 
     def get_bytes_range(self, uri: str, offset: int, length: int) -> bytes:
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].get_bytes_range(uri, offset, length)
+        return self._handler_for(uri).get_bytes_range(uri, offset, length)
 
     # Create_text_file does not adhere to solid, move this to a separate class?
     def create_text_file(self, text: str, suffix: Optional[str]) -> Path:
@@ -110,25 +136,21 @@ class SchemeFileHandler:
         Say you're in /home you can set path to "test.txt" and this function will return /home/test.txt
         Just a small reminder that this function does not support parent directory or other special operations.
         """
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].navigate(uri, path)
+        return self._handler_for(uri).navigate(uri, path)
 
     def file_exists(self, uri: str) -> bool:
         """
         Checks for the existence of a file at the specified URI.
         The check is performed by the handler corresponding to the URI's scheme.
         """
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].file_exists(uri)
+        return self._handler_for(uri).file_exists(uri)
 
     def upload_folder(self, folder: Path, uri: str) -> None:
-        parsed_uri = urlparse(uri)
-        self.scheme_handlers[parsed_uri.scheme].upload_folder(folder, uri)
+        self._handler_for(uri).upload_folder(folder, uri)
 
     def get_file_size(self, uri: str) -> int:
         """
         Get the size of a file in bytes at the specified URI.
         The size check is performed by the handler corresponding to the URI's scheme.
         """
-        parsed_uri = urlparse(uri)
-        return self.scheme_handlers[parsed_uri.scheme].get_file_size(uri)
+        return self._handler_for(uri).get_file_size(uri)
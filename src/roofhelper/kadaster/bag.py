@@ -1,18 +1,26 @@
 import logging
-from multiprocessing import Queue, Process
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
 
 import os
 from datetime import datetime
+from itertools import compress
+from operator import itemgetter
 from pathlib import Path
 from typing import Any, Iterator, Optional
 from osgeo import ogr
 
-import fiona
-from fiona.crs import from_epsg
-from shapely import Polygon, wkb
+import geopandas as gpd
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
+import pyogrio
+import shapely
+from shapely import Polygon
 
 # Schema used in gpkg for lvbag
-_bag_schema = {
+_bag_schema: dict[str, Any] = {
     'geometry': 'Polygon',
     'properties': {
         'identificatie': 'str',
@@ -34,8 +42,15 @@ _bag_schema = {
         'force_low_lod': 'bool'
     }
 }
+_bag_dtypes: dict[str, Any] = {'str': object, 'int': 'Int64', 'bool': bool}  # Pandas dtypes for the schema types, Int64 keeps missing values as null
+_bag_read_properties = tuple(name for name in _bag_schema['properties'] if name != 'force_low_lod')  # Properties read from the LVBAG, in schema order
+_bag_read_columns = itemgetter(*_bag_read_properties, 'geometry')  # Gets the schema properties and the geometry of a feature as one tuple
 BAG_DATE_FORMAT = "%Y/%m/%d"
 
+# Panden with one of these statuses never count as existing buildings, regardless of the dates
+BAG_EXCLUDED_STATUSES = np.array(["Niet gerealiseerd pand", "Pand gesloopt", "Bouwvergunning verleend", "Pand ten onrechte opgevoerd", None], dtype=object)
+GEOMETRY_BATCH_SIZE = 4096
+
 # Function to convert a string to datetime or return None
 
 
@@ -54,60 +69,107 @@ def _to_datetime(date_str: str) -> datetime:
     return datetime.strptime(date_str[:10], BAG_DATE_FORMAT)
 
 
-def _bag_filtered_by_year(source: Path, year: int) -> Iterator[Optional[dict[Any, Any]]]:
-    """ Filter BAG by a specific year """
-    reference_date = datetime(year=year, month=12, day=31)
-
+def _is_bag_date(date_str: Optional[str]) -> bool:
+    """ Checks the YYYY/MM/DD separators, numpy also accepts other forms like a bare year that strptime rejects """
+    return date_str is not None and date_str[4:5] == "/" and date_str[7:8] == "/"
+
+
+def _to_datetime64(values: list[Optional[str]], required: bool) -> npt.NDArray[np.datetime64]:
+    """
+    Converts a column of BAG date strings to datetime64[D], missing or invalid optional dates become NaT.
+    A missing or invalid required date raises, like _to_datetime.
+    """
+    if all(_is_bag_date(value) or (not required and not value) for value in values):
+        try:
+            # YYYY/MM/DD only needs the separators replaced to be parsed by numpy in one go
+            return np.array([value[:10].replace("/", "-") if value else None for value in values], dtype="datetime64[D]")
+        except ValueError:
+            pass  # Not a valid date, like month 13, let the helpers decide
+
+    # At least one date is missing or not in the expected format, parse them one by one with the same helpers as a single feature
+    parsed = [_to_datetime(value) if required else _to_datetime_optional(value) for value in values]  # type: ignore[arg-type]
+    return np.array(parsed, dtype="datetime64[D]")
+
+
+def _filter_batch_by_year(batch: list[dict[Any, Any]], reference_date: np.datetime64) -> dict[str, npt.NDArray[Any]]:
+    """
+    Evaluates the year filter for a whole batch of features at once, a missing or invalid required date raises.
+    Returns the selected features as columns, one array per property in the bag schema plus the geometry.
+    """
+    def _column(name: str) -> list[Any]:
+        return [feature[name] for feature in batch]
+
+    tijdstipInactiefLV = _to_datetime64(_column("tijdstipInactiefLV"), required=False)
+    tijdstipNietBagLV = _to_datetime64(_column("tijdstipNietBagLV"), required=False)
+    tijdstipRegistratieLV = _to_datetime64(_column("tijdstipRegistratieLV"), required=True)
+    tijdstipEindRegistratieLV = _to_datetime64(_column("tijdstipEindRegistratieLV"), required=False)
+    beginGeldigheid = _to_datetime64(_column("beginGeldigheid"), required=True)
+    eindGeldigheid = _to_datetime64(_column("eindGeldigheid"), required=False)
+
+    mask = np.isin(np.array(_column("status"), dtype=object), BAG_EXCLUDED_STATUSES, invert=True) & \
+        (np.isnat(tijdstipInactiefLV) | (tijdstipInactiefLV > reference_date)) & \
+        (np.isnat(tijdstipNietBagLV) | (tijdstipNietBagLV > reference_date)) & \
+        (tijdstipRegistratieLV <= reference_date) & \
+        (np.isnat(tijdstipEindRegistratieLV) | (tijdstipEindRegistratieLV > reference_date)) & \
+        (beginGeldigheid <= reference_date) & \
+        (np.isnat(eindGeldigheid) | (eindGeldigheid == beginGeldigheid) | (eindGeldigheid > reference_date))
+
+    # Transpose only the selected features, all columns in one pass over the batch
+    selected = [_bag_read_columns(feature) for feature in compress(batch, mask)]
+    rows = np.empty((len(selected), len(_bag_read_properties) + 1), dtype=object)
+    if selected:  # numpy can't broadcast an empty list into the (0, n) array, a batch without selected features keeps the empty columns
+        rows[:] = selected
+
+    columns = {name: rows[:, i] for i, name in enumerate(_bag_read_properties)}
+    columns['force_low_lod'] = np.zeros(len(selected), dtype=bool)
+    columns['geometry'] = rows[:, -1]
+    return columns
+
+
+def _bag_filtered_by_year(source: Path, year: int) -> Iterator[dict[str, npt.NDArray[Any]]]:
+    """ Filter BAG by a specific year, yields the selected features per batch of BATCH_SIZE read features as columns """
+    reference_date = np.datetime64(f"{year:04d}-12-31", "D")
+
+    batch: list[dict[Any, Any]] = []
     for feature in bag_zip_read(source):
-        tijdstipInactiefLV = _to_datetime_optional(feature["tijdstipInactiefLV"])
-        tijdstipNietBagLV = _to_datetime_optional(feature["tijdstipNietBagLV"])
-        tijdstipRegistratieLV = _to_datetime(feature["tijdstipRegistratieLV"])
-        tijdstipEindRegistratieLV = _to_datetime_optional(feature["tijdstipEindRegistratieLV"])
-        beginGeldigheid = _to_datetime(feature["beginGeldigheid"])
-        eindGeldigheid = _to_datetime_optional(feature["eindGeldigheid"])
+        batch.append(feature)
+        if len(batch) == BATCH_SIZE:
+            yield _filter_batch_by_year(batch, reference_date)
+            batch = []
 
-        if (feature["status"] not in ["Niet gerealiseerd pand", "Pand gesloopt", "Bouwvergunning verleend", "Pand ten onrechte opgevoerd", None]) and \
-            (tijdstipInactiefLV is None or tijdstipInactiefLV > reference_date) and \
-            (tijdstipNietBagLV is None or tijdstipNietBagLV > reference_date) and \
-            (tijdstipRegistratieLV <= reference_date) and \
-            (tijdstipEindRegistratieLV is None or tijdstipEindRegistratieLV > reference_date) and \
-            (beginGeldigheid <= reference_date) and \
-                (eindGeldigheid is None or eindGeldigheid == beginGeldigheid or eindGeldigheid > reference_date):
-            feature["force_low_lod"] = False
-            yield feature
+    if batch:
+        yield _filter_batch_by_year(batch, reference_date)
 
-    yield None
 
-
-def _bag_reader_producer(source: Path, year: int, output_queue: "Queue[Optional[dict[Any, Any]]]") -> None:
-    """ This is the producer part of the  """
-    print(f"Worker process started for year {year}...")
-    for feature in _bag_filtered_by_year(source, year):
-        output_queue.put(feature)
+def _bag_reader_producer(source: Path, year: int, output_queue: "Queue[Optional[dict[str, npt.NDArray[Any]]]]", stop: threading.Event) -> None:
+    """ This is the producer part of extract_by_year, sends the filtered features in column batches followed by a None sentinel """
+    logger.info(f"Reader thread started for year {year}...")
+    try:
+        for columns in _bag_filtered_by_year(source, year):
+            if stop.is_set():  # The consumer failed, nobody is waiting for the remaining batches
+                break
+            output_queue.put(columns)
+    finally:
+        output_queue.put(None)  # Also on an error, so the consumer never waits forever
 
 
-def remove_spikes(polygon: Polygon, epsilon: float = 1e-4) -> Polygon:
-    def is_colinear(p1: tuple[float, ...], p2: tuple[float, ...], p3: tuple[float, ...]) -> bool:
-        # Calculate the area of the triangle formed by the three points
-        val = abs((p1[0] * (p2[1] - p3[1]) + p2[0] * (p3[1] - p1[1]) + p3[0] * (p1[1] - p2[1])) / 2.0)
+def _columns_to_dataframe(columns: dict[str, npt.NDArray[Any]]) -> gpd.GeoDataFrame:
+    """ Creates the GeoDataFrame for a column batch, typed according to the bag schema """
+    data = {name: pd.array(columns[name], dtype=_bag_dtypes[field_type]) for name, field_type in _bag_schema['properties'].items()}
+    return gpd.GeoDataFrame(data, geometry=columns['geometry'], crs="EPSG:28992")
 
-        if val == 0.0:  # The starting point will always create a triangle with surface area of 0.
-            # As begin point equals endpoint.
-            return False
-        else:
-            return val < epsilon
 
-    coords = list(polygon.exterior.coords)
-    cleaned = []
+def remove_spikes(polygon: Polygon, epsilon: float = 1e-4) -> Polygon:
+    """ Removes the vertices of the exterior that form a triangle with their neighbours with a surface area below epsilon """
+    coords = shapely.get_coordinates(polygon.exterior, include_z=polygon.has_z)
+    previous = np.roll(coords, 1, axis=0)
+    following = np.roll(coords, -1, axis=0)
 
-    for i in range(len(coords)):
-        prev = coords[i - 1]
-        curr = coords[i]
-        nxt = coords[(i + 1) % len(coords)]
+    # Area of the triangle formed by every vertex and its two neighbours
+    area = np.abs((previous[:, 0] * (coords[:, 1] - following[:, 1]) + coords[:, 0] * (following[:, 1] - previous[:, 1]) + following[:, 0] * (previous[:, 1] - coords[:, 1])) / 2.0)
 
-        # Skip if current point is colinear with neighbors
-        if not is_colinear(prev, curr, nxt):
-            cleaned.append(curr)
+    # The starting point will always create a triangle with surface area of 0, as begin point equals endpoint.
+    cleaned = coords[(area == 0.0) | (area >= epsilon)]
 
     if len(cleaned) > 3:
         return Polygon(cleaned)
@@ -115,6 +177,24 @@ def remove_spikes(polygon: Polygon, epsilon: float = 1e-4) -> Polygon:
         return polygon
 
 
+def _simplify_geometries(geometries: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """
+    BAG doesn't always contain valid shapes in this case we want to check for the following:
+    Remove any duplicate vertices and prevent self intersecting geometries using simplify and buffer functions of shapely.
+    """
+    simplified_geometries = shapely.simplify(geometries, tolerance=0.05, preserve_topology=True)
+
+    # Most panden are valid after simplify, only those that aren't need the expensive buffer. buffer(0) orients the
+    # exterior clockwise and keeps the start vertex of a valid ring, so orienting the valid ones gives the same coordinates,
+    # which matters because remove_spikes always keeps the start vertex. test_bag.py checks this for the installed GEOS.
+    # Invalid ones are not oriented first, the part of an invalid polygon that buffer(0) keeps depends on its orientation
+    valid = shapely.is_valid(simplified_geometries)
+    simplified_geometries[valid] = shapely.orient_polygons(simplified_geometries[valid], exterior_cw=True)
+    if not valid.all():
+        simplified_geometries[~valid] = shapely.buffer(simplified_geometries[~valid], 0)
+    return simplified_geometries
+
+
 def bag_zip_read(lvbag_zip: Path) -> Iterator[dict[Any, Any]]:
     """ Reads the pand table from the LVBAG zip uploaded by PDOK """
     ogr.UseExceptions()  # Allows gdal to communicate errors to python
@@ -131,60 +211,69 @@ def bag_zip_read(lvbag_zip: Path) -> Iterator[dict[Any, Any]]:
 
     layer = dataset.GetLayer()
     layer_definition = layer.GetLayerDefn()
+    field_names = tuple(layer_definition.GetFieldDefn(i).GetName() for i in range(layer_definition.GetFieldCount()))  # Resolved once, not for every feature
+    field_indices = tuple(enumerate(field_names))
 
     feature = layer.GetNextFeature()  # Get the first feature
 
     while feature:
-        feature_data = {}
+        # Collect a batch of features, so the geometries can be cleaned up with one GEOS call per operation
+        batch: list[dict[Any, Any]] = []
+        wkbs: list[bytes] = []
+        while feature and len(batch) < GEOMETRY_BATCH_SIZE:
+            feature_data = {name: feature.GetField(i) for i, name in field_indices}
 
-        for i in range(layer_definition.GetFieldCount()):
-            field_definition = layer_definition.GetFieldDefn(i)
-            feature_data[field_definition.GetName()] = feature.GetField(i)
+            batch.append(feature_data)
+            wkbs.append(bytes(feature.GetGeometryRef().ExportToIsoWkb()))
+            feature = layer.GetNextFeature()  # Get the next feature
 
-        geometry = feature.GetGeometryRef()
-        wkbgeom = wkb.loads(bytes(geometry.ExportToIsoWkb()))
-        # BAG doesn't always contain valid shapes in this case we want to check for the following:
-        # Remove any duplicate vertices and prevent self intersecting geometries
-        # using simplify and buffer functions of shapely
-        simplified_geometry = wkbgeom.simplify(tolerance=0.05, preserve_topology=True).buffer(0)
-        clean_geometry = remove_spikes(simplified_geometry)  # remove any points that create a triangle smaller than 0.1 square millimeters
+        simplified_geometries = _simplify_geometries(shapely.from_wkb(np.array(wkbs, dtype=object)))
 
-        feature_data['geometry'] = clean_geometry
-        feature = layer.GetNextFeature()  # Get the next feature
-
-        yield feature_data
+        for feature_data, simplified_geometry in zip(batch, simplified_geometries):
+            feature_data['geometry'] = remove_spikes(simplified_geometry)  # remove any points that create a triangle smaller than 0.1 square millimeters
+            yield feature_data
 
 
 BATCH_SIZE = 100000
+QUEUE_SIZE = 4  # Number of batches that can be in flight between producer and consumer
 logger = logging.getLogger()
 
 
 def extract_by_year(source: Path, target: Path, year: int) -> None:
     """ Reads the lvbag zip and outputs a filtered by year gpkg, date set for year is {year}-12-31 """
-    feature_queue: Queue[Optional[dict[Any, Any]]] = Queue(BATCH_SIZE * 2)
-    worker_process = Process(
-        target=_bag_reader_producer,  # Producer of the feature queue, reads panden from lvbag
-        args=(source, year, feature_queue)
-    )
-    worker_process.start()
-
-    # Consumer of the feature queue, responsible for writing the filtered by year
-    # pand output to a gpkg
-    batch: list[dict[str, Any]] = []
-    with fiona.open(target, 'w', driver="GPKG", schema=_bag_schema, crs=from_epsg(28992)) as gpkg_target:
-        while True:
-            feature = feature_queue.get()
-            if feature is None:
-                break
-
-            batch.append({'geometry': feature.pop('geometry', None), 'properties': feature})
-            if (len(batch) % BATCH_SIZE) == 0:
-                gpkg_target.writerecords(batch)
-                batch.clear()
-                logger.info(f"Finished processing {BATCH_SIZE} records, waiting for next batch")
-
-        if len(batch) > 0:
-            gpkg_target.writerecords(batch)
-            logger.info(f"Finished processing {len(batch)} records, done reading bag")
-
-        worker_process.join()
+    feature_queue: Queue[Optional[dict[str, npt.NDArray[Any]]]] = Queue(QUEUE_SIZE)
+    stop = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # Producer of the feature queue, reads panden from lvbag. GDAL releases the GIL while reading and writing,
+        # so a thread overlaps the read with the write without pickling every batch to another process
+        producer = executor.submit(_bag_reader_producer, source, year, feature_queue, stop)
+
+        # Consumer of the feature queue, responsible for writing the filtered by year
+        # pand output to a gpkg
+        created = False
+        done = False
+        try:
+            while True:
+                columns = feature_queue.get()
+                if columns is None:
+                    done = True
+                    logger.info("Done reading bag")
+                    break
+
+                # The first batch creates (or overwrites) the gpkg, the following batches are appended
+                pyogrio.write_dataframe(_columns_to_dataframe(columns), target, driver="GPKG", geometry_type="Polygon", append=created)
+                created = True
+                logger.info(f"Finished processing {len(columns['geometry'])} records, waiting for next batch")
+        finally:
+            if not done:  # Writing failed, stop the producer and unblock it until it sends the sentinel
+                stop.set()
+                while feature_queue.get() is not None:
+                    pass
+
+        producer.result()  # Raises the error of the producer, if any
+
+    if not created:  # Nothing passed the filter, still create the gpkg with the bag schema
+        empty: dict[str, npt.NDArray[Any]] = {name: np.array([], dtype=object) for name in _bag_schema['properties']}
+        empty['geometry'] = np.array([], dtype=object)
+        pyogrio.write_dataframe(_columns_to_dataframe(empty), target, driver="GPKG", geometry_type="Polygon")
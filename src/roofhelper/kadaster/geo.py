@@ -1,61 +1,70 @@
-import math
-import multiprocessing
 from pathlib import Path
-from typing import Generator, List, Optional, Tuple
+from typing import Any, Generator, Optional
 
-import fiona
-import geopandas as gpd
-from shapely.geometry import Polygon, box
+import numpy as np
+import numpy.typing as npt
+import pyogrio
+import shapely
 
+CENTROID_CHUNK_SIZE = 1000000  # Number of footprints read at once, bounds the memory use for the whole of NL
 
-def _process_cell(args: Tuple[int, int, int, Path]) -> Optional[Tuple[float, float, float, float]]:
-    x, y, grid_size, filepath = args
-    cell: Polygon = box(x, y, x + grid_size, y + grid_size)
-    footprints: gpd.GeoDataFrame = gpd.read_file(filepath, bbox=cell, layer=0)
-    footprints_within: gpd.GeoDataFrame = footprints[footprints.centroid.within(cell)]
-    if len(footprints_within) > 0:
-        return float(x), float(y), float(x + grid_size), float(y + grid_size)
-    return None
 
+def _centroid_coordinates(geometries: npt.NDArray[Any]) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """ Returns the x and y of the centroid of every geometry, NaN for missing or empty geometries """
+    centroids = shapely.centroid(geometries)
+    centroids[shapely.is_empty(centroids)] = None  # getX is not supported on an empty point
+    return shapely.get_x(centroids), shapely.get_y(centroids)
 
-def _generate_cells(
-    minx: float,
-    maxx: float,
-    miny: float,
-    maxy: float,
-    grid_size: int,
-    filepath: Path
-) -> Generator[Tuple[float, float, float, float], None, None]:
-    tasks: List[Tuple[int, int, int, Path]] = [
-        (x, y, grid_size, filepath)
-        for x in range(int(minx), int(maxx), grid_size)
-        for y in range(int(miny), int(maxy), grid_size)
-    ]
 
-    with multiprocessing.Pool() as pool:
-        results: List[Optional[Tuple[float, float, float, float]]] = pool.map(_process_cell, tasks)
+def _footprint_cells(filepath: Path, grid_size: int) -> Generator[npt.NDArray[np.int64]]:
+    """ Reads the footprints in chunks and yields the unique (ix, iy) grid indices of their centroids per chunk """
+    # With skip_features GDAL steps over all earlier features again for every chunk. When the format has a FID column,
+    # like the primary key of a geopackage, every chunk continues after the last FID of the previous one instead.
+    # Other formats keep the offset, their FID can be shadowed by an attribute field with the same name
+    fid_column = pyogrio.read_info(filepath, layer=0)["fid_column"]
+    offset = 0
+    last_fid: Optional[int] = None
+    while True:
+        # Only the geometry is needed, skip reading the attribute columns
+        if fid_column:
+            where = None if last_fid is None else f'"{fid_column}" > {last_fid}'
+            footprints = pyogrio.read_dataframe(filepath, layer=0, columns=[], where=where, max_features=CENTROID_CHUNK_SIZE, fid_as_index=True)
+        else:
+            footprints = pyogrio.read_dataframe(filepath, layer=0, columns=[], skip_features=offset, max_features=CENTROID_CHUNK_SIZE)
+        if len(footprints) == 0:
+            break
 
-    for result in results:
-        if result is not None:
-            yield result
+        x, y = _centroid_coordinates(footprints.geometry.values)
+        valid = ~(np.isnan(x) | np.isnan(y))  # Empty or missing geometries have no centroid
 
+        indices = np.stack([np.floor(x[valid] / grid_size), np.floor(y[valid] / grid_size)], axis=1).astype(np.int64)
+        yield np.unique(indices, axis=0)
 
-def grid_create_on_intersecting_centroid(filepath: Path, grid_size: int) -> Generator[tuple[float, float, float, float]]:
-    bounds = None
-
-    with fiona.open(filepath, 'r') as src:
-        bounds = src.bounds
+        if len(footprints) < CENTROID_CHUNK_SIZE:
+            break
+        offset += CENTROID_CHUNK_SIZE
+        if fid_column:
+            last_fid = int(footprints.index.max())
 
-    if bounds is None:
-        raise ValueError(f"Could not determine bounds for file: {filepath}")
 
-    minx, miny, maxx, maxy = bounds
+def grid_create_on_intersecting_centroid(filepath: Path, grid_size: int) -> Generator[tuple[float, float, float, float]]:
+    """
+    Yields the extent of every grid cell that contains the centroid of at least one footprint,
+    ordered by x and then y. The footprints are read once and bucketed by the grid index of their centroid.
+    """
+    chunks = list(_footprint_cells(filepath, grid_size))
+    if not chunks:
+        return
 
-    minx = math.floor(minx / grid_size) * grid_size
-    miny = math.floor(miny / grid_size) * grid_size
+    for ix, iy in np.unique(np.concatenate(chunks), axis=0).tolist():
+        yield float(ix * grid_size), float(iy * grid_size), float((ix + 1) * grid_size), float((iy + 1) * grid_size)
 
-    maxx = math.ceil(maxx / grid_size) * grid_size
-    maxy = math.ceil(maxy / grid_size) * grid_size
 
-    for cell in _generate_cells(minx, maxx, miny, maxy, grid_size, filepath):
-        yield cell
+def centroid_in_extent(geometries: npt.NDArray[Any], extent: tuple[float, float, float, float]) -> npt.NDArray[np.bool_]:
+    """
+    Tests which geometries have their centroid in the extent with plain coordinate comparisons instead of a GEOS predicate.
+    The extent is half open on the max side, like the cells of grid_create_on_intersecting_centroid, so neighbouring cells never share a footprint.
+    """
+    x, y = _centroid_coordinates(geometries)
+    minx, miny, maxx, maxy = extent
+    return (x >= minx) & (x < maxx) & (y >= miny) & (y < maxy)  # NaN for empty geometries compares False
@@ -1,7 +1,20 @@
+import functools
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any
-import copy
+from pathlib import Path
+from typing import Any, TypeVar, cast
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from roofhelper.io import EntryProperties, SchemeFileHandler
+
+LISTING_WORKERS = 16  # Number of directory listings in flight at once, remote listings are latency bound
+
+K = TypeVar("K")
 
 PDOK_DELIVERY_BASE_SCHEMA: dict[str, Any] = {
     'geometry': 'Polygon',
@@ -16,12 +29,11 @@ PDOK_DELIVERY_BASE_SCHEMA: dict[str, Any] = {
 
 
 def createBaseSchema(extend: dict[str, str]) -> dict[Any, Any]:
-    result = copy.deepcopy(PDOK_DELIVERY_BASE_SCHEMA)
-    result["properties"].update(extend)
-    return result
+    # The schema only holds strings, new dicts for both levels are enough to leave the base schema untouched
+    return {**PDOK_DELIVERY_BASE_SCHEMA, "properties": {**PDOK_DELIVERY_BASE_SCHEMA["properties"], **extend}}
 
 
-@dataclass
+@dataclass(slots=True)
 class PdokDeliveryProperties:
     """Properties for PDOK delivery features."""
     bladnr: str
@@ -29,3 +41,36 @@ class PdokDeliveryProperties:
     download_link: str
     startdatum: datetime
     einddatum: datetime
+
+
+def is_year_name(name: str) -> bool:
+    """ Whether a directory name is a delivery year, the length check rejects most other names before scanning them.
+    isascii excludes digits like superscripts, which isdigit accepts but int() can't parse. """
+    return len(name) == 4 and name.isascii() and name.isdigit()
+
+
+def list_entries_concurrently(executor: ThreadPoolExecutor, file_handler: SchemeFileHandler, uris: dict[K, str], regex: str = '') -> dict[K, Future[list[EntryProperties]]]:
+    """ Submit a shallow listing per uri, listings are I/O bound so the remote latency overlaps. Errors surface when calling result(). """
+    def _list(uri: str) -> list[EntryProperties]:
+        return list(file_handler.list_entries_shallow(uri, regex=regex))
+
+    return {key: executor.submit(_list, uri) for key, uri in uris.items()}
+
+
+@functools.lru_cache(maxsize=8)
+def load_ahn_geometries(ahn_json_path: Path) -> dict[str, Polygon]:
+    """ Load the AHN tile geometries from ahn.json, keyed by the lowercase AHN key. Cached per path, the result must not be modified. """
+    with open(ahn_json_path, 'r') as f:
+        ahn_data: dict[str, list[float]] = json.load(f)
+
+    if not ahn_data:
+        return {}
+
+    # bbox format: [minx, miny, maxx, maxy], create all polygons with one call.
+    # Ring: bottom-left, bottom-right, top-right, top-left, bottom-left
+    bboxes = np.array(list(ahn_data.values()), dtype=np.float64)
+    corners = np.stack([bboxes[:, [0, 2, 2, 0, 0]], bboxes[:, [1, 1, 3, 3, 1]]], axis=2)
+    ahn_geometries = cast(list[Polygon], shapely.polygons(corners))
+
+    # Convert all keys to lowercase
+    return dict(zip((key.lower() for key in ahn_data), ahn_geometries))
@@ -1,23 +1,36 @@
-import json
+import functools
 import os
 import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Any, Optional, Dict, List, cast
 from dataclasses import dataclass
 
+import numpy as np
+import numpy.typing as npt
+import shapely
 from shapely.geometry import Polygon
 from roofhelper.defaultlogging import setup_logging
-from roofhelper.io import SchemeFileHandler
-from roofhelper.pdok.PdokDelivery import createBaseSchema, PdokDeliveryProperties
+from roofhelper.io import EntryProperties, SchemeFileHandler
+from roofhelper.pdok.PdokDelivery import LISTING_WORKERS, createBaseSchema, is_year_name, list_entries_concurrently, load_ahn_geometries, PdokDeliveryProperties
 from roofhelper.pdok.PdokGeopackageWriter import FeatureWithGeometry
 
 log = setup_logging()
 
 PDOK_DELIVERY_SCHEMA_GEBOUW = createBaseSchema({"jaargang_luchtfoto": "int"})
 
+# Filename patterns, compiled once as they are matched against every file in the delivery
+_DSM_FILENAME_PATTERN = re.compile(r"DSM_(?P<x>\d{4})_(?P<y>\d{4})\.laz\Z")
+_NEW_FORMAT_PATTERN = re.compile(r"^(.+)_(\d{4})_(\d+)_(\d+)(?:\.\w+)?$")
 
-@dataclass
+_3D_LAYER_NAMES = frozenset(("volledig", "hoogtestatistieken", "gebouwen"))  # 3D layer directories that are delivered
+
+ListingKey = tuple[int, str]  # (year, layer name)
+
+
+@dataclass(slots=True)
 class PdokDeliveryPropertiesBuilding(PdokDeliveryProperties):
     """Properties for PDOK delivery features."""
     jaargang_luchtfoto: int
@@ -30,7 +43,7 @@ def _extract_dsm_coordinates_from_filename(filename: str) -> Optional[tuple[int,
     Example: DSM_1234_5678.laz -> (1234, 5678)
     """
     basename = os.path.basename(filename)
-    regex_match = re.search(r"^(?:.*)DSM_(?P<x>\d{4})_(?P<y>\d{4})\.laz$", basename)
+    regex_match = _DSM_FILENAME_PATTERN.search(basename)
     if regex_match:
         x = int(regex_match.group("x"))
         y = int(regex_match.group("y"))
@@ -44,25 +57,38 @@ def _extract_legacy_ahn_key_from_filename(filename: str) -> Optional[str]:
     Expected pattern: <ahn_key>_<anything> - Example: 13bn1_something.laz -> 13bn1
     """
     basename = os.path.basename(filename)
-    legacy_match = re.match(r"^(?:.*)([0-9]{2}[a-z]{2}\d)(?:_.*)$", basename, re.IGNORECASE)
-    if legacy_match:
-        return legacy_match.group(1)
+
+    # The key is the 5 characters before an underscore (2 digits, 2 letters, 1 digit), the last underscore that has one wins
+    underscore = basename.rfind("_")
+    while underscore >= 5:
+        key = basename[underscore - 5:underscore]
+        if key.isascii() and key[:2].isdigit() and key[2:4].isalpha() and key[4].isdigit():
+            return key
+        underscore = basename.rfind("_", 0, underscore)
     return None
 
 
-def _extract_ahn_key_from_filename(filename: str) -> Optional[str]:
+def _parse_3d_filename(filename: str) -> tuple[Optional[str], Optional[tuple[int, int]]]:
     """
-    Extracts AHN key from filename, supporting both legacy and new formats.
-    Returns the key that can be used to look up geometry.
+    Parses a 3D layer filename with a single match per format, supporting both legacy and new formats.
+    Returns the AHN key and, for the new format, the coordinates of the tile.
     """
     # Try new format first: <name>_<year>_<x>_<y>
     coords = _extract_coordinates_from_new_format(filename)
     if coords:
         x, y = coords
-        return f"{x}_{y}"
+        return f"{x}_{y}", coords
 
     # Try legacy format: <ahn_key>_<anything>
-    return _extract_legacy_ahn_key_from_filename(filename)
+    return _extract_legacy_ahn_key_from_filename(filename), None
+
+
+def _extract_ahn_key_from_filename(filename: str) -> Optional[str]:
+    """
+    Extracts AHN key from filename, supporting both legacy and new formats.
+    Returns the key that can be used to look up geometry.
+    """
+    return _parse_3d_filename(filename)[0]
 
 
 def _extract_coordinates_from_new_format(filename: str) -> Optional[tuple[int, int]]:
@@ -72,7 +98,7 @@ def _extract_coordinates_from_new_format(filename: str) -> Optional[tuple[int, i
     Example: gebouwen_2021_123_456.laz -> (123, 456)
     """
     basename = os.path.basename(filename)
-    regex_match = re.match(r"^(.+)_(\d{4})_(\d+)_(\d+)(?:\.\w+)?$", basename)
+    regex_match = _NEW_FORMAT_PATTERN.match(basename)
     if regex_match:
         x = int(regex_match.group(3))
         y = int(regex_match.group(4))
@@ -80,6 +106,7 @@ def _extract_coordinates_from_new_format(filename: str) -> Optional[tuple[int, i
     return None
 
 
+@functools.lru_cache(maxsize=32768)  # Room for every 2 km tile of NL (the RD extent is about 140 x 165 tiles), which repeat for every year and layer. Shapely geometries are immutable so they can be shared
 def _create_geometry_from_coordinates(x: int, y: int, tile_size_meters: int = 2000) -> Polygon:
     """
     Create proper bounding box geometry for tile based on coordinates and tile size.
@@ -103,255 +130,245 @@ def _create_geometry_from_coordinates(x: int, y: int, tile_size_meters: int = 20
     ])
 
 
-def _create_dsm_geometry(x: int, y: int) -> Polygon:
-    """Create geometry for DSM tile based on coordinates."""
+def _create_dsm_geometries(x: npt.NDArray[np.int64], y: npt.NDArray[np.int64]) -> npt.NDArray[Any]:
+    """Create the geometries of DSM tiles based on coordinates, with one shapely call for all tiles."""
     dsm_grid_size = 250  # 250 meters
 
     # Convert to actual coordinates
     x = x * 100
     y = y * 100
 
-    # Apply offset for certain coordinate patterns
-    if str(x)[-3] in ('2', '7'):
-        x = x + 50
-    if str(y)[-3] in ('2', '7'):
-        y = y + 50
+    # Apply offset for certain coordinate patterns, tiles with a hundreds digit of 2 or 7 start 50 meters further
+    x = x + np.where(np.isin((x // 100) % 10, (2, 7)), 50, 0)
+    y = y + np.where(np.isin((y // 100) % 10, (2, 7)), 50, 0)
 
-    return _create_geometry_from_coordinates(x, y, dsm_grid_size)
+    # Same ring as _create_geometry_from_coordinates: bottom-left, bottom-right, top-right, top-left, bottom-left
+    corners_x = np.stack([x, x + dsm_grid_size, x + dsm_grid_size, x, x], axis=1)
+    corners_y = np.stack([y, y, y + dsm_grid_size, y + dsm_grid_size, y], axis=1)
+    return cast(npt.NDArray[Any], shapely.polygons(np.stack([corners_x, corners_y], axis=2).astype(np.float64)))
 
 
-def _process_dsm_layers(file_handler: SchemeFileHandler, source_uri: str, download_url_prefix: str) -> Dict[str, List[FeatureWithGeometry]]:
-    """
-    Process DSM layers and return features grouped by layer type.
+def _create_dsm_geometry(x: int, y: int) -> Polygon:
+    """Create geometry for DSM tile based on coordinates."""
+    return _create_dsm_geometries(np.array([x]), np.array([y]))[0]
 
-    Args:
-        file_handler: SchemeFileHandler instance
-        source_uri: URI to source directory containing year folders
-        download_url_prefix: URL prefix for download links
+
+def _list_year_directories(file_handler: SchemeFileHandler, source_uri: str, executor: ThreadPoolExecutor) -> Dict[int, tuple[str, List[EntryProperties]]]:
+    """
+    List the year directories (directories with numeric names) and their entries once,
+    so the DSM and 3D layers don't have to list them again.
 
     Returns:
-        Dictionary mapping DSM layer types to lists of features
+        Dictionary mapping the year to the year uri and the entries in the year directory, sorted by year
     """
-    # Dynamically discover year directories (directories with numeric names)
     year_directories = []
     for entry in file_handler.list_entries_shallow(source_uri):
-        if entry.is_directory and entry.name.isdigit():
+        if entry.is_directory and is_year_name(entry.name):
             year_directories.append(int(entry.name))
 
     year_directories.sort()  # Sort years for consistent processing
-    log.info(f"Found year directories for DSM processing: {year_directories}")
-
-    features_by_type: Dict[str, List[FeatureWithGeometry]] = {}
+    log.info(f"Found year directories: {year_directories}")
 
-    # Process each year directory
-    for year in year_directories:
-        year_uri = file_handler.navigate(source_uri, str(year))
+    year_uris = {year: file_handler.navigate(source_uri, str(year)) for year in year_directories}
 
+    years: Dict[int, tuple[str, List[EntryProperties]]] = {}
+    for year, listing in list_entries_concurrently(executor, file_handler, year_uris).items():
         try:
             # Check if year directory exists
-            year_entries = list(file_handler.list_entries_shallow(year_uri))
+            year_entries = listing.result()
             if not year_entries:
-                log.warning(f"No entries found in {year_uri}, skipping year {year}")
+                log.warning("No entries found in %s, skipping year %s", year_uris[year], year)
                 continue
 
-            # Dynamically discover DSM layer directories
-            dsm_layer_directories = []
-            for entry in year_entries:
-                if entry.is_directory and entry.name.startswith("dsm"):
-                    dsm_layer_directories.append(entry.name)
-
-            log.info(f"Found DSM layer directories for year {year}: {dsm_layer_directories}")
-
-            # Process DSM layers
-            for layer_name in dsm_layer_directories:
-                try:
-                    layer_uri = file_handler.navigate(year_uri, f"{layer_name}/laz")
-
-                    # Initialize feature collection for this layer if not exists
-                    if layer_name not in features_by_type:
-                        features_by_type[layer_name] = []
-
-                    for file_entry in file_handler.list_entries_shallow(layer_uri, regex=r'.*\.laz$'):
-                        if not file_entry.is_file:
-                            continue
-
-                        # Extract coordinates from filename
-                        coords = _extract_dsm_coordinates_from_filename(file_entry.name)
-                        if not coords:
-                            continue
-
-                        x, y = coords
-                        geometry = _create_dsm_geometry(x, y)
-
-                        # Create start and end dates
-                        start_date = datetime(year, 1, 1)
-                        end_date = datetime(year, 12, 31, 23, 59, 59)
-
-                        # Create bladnr from filename
-                        bladnr = file_entry.name.replace(".laz", "").replace("DSM_", "")
-
-                        # Construct download link
-                        relative_path = file_entry.path.lstrip('/')
-                        download_link = f"{download_url_prefix}{relative_path}"
-
-                        # Create feature
-                        properties = PdokDeliveryPropertiesBuilding(
-                            bladnr=bladnr,
-                            jaargang_luchtfoto=year,
-                            download_size_bytes=file_entry.size or 0,
-                            download_link=download_link,
-                            startdatum=start_date,
-                            einddatum=end_date,
-                        )
-
-                        feature = FeatureWithGeometry(
-                            geometry=geometry,
-                            properties=properties
-                        )
-                        features_by_type[layer_name].append(feature)
-
-                except Exception as e:
-                    log.warning(f"Failed to process layer {layer_name} for year {year}: {e}")
+            years[year] = (year_uris[year], year_entries)
+        except Exception as e:
+            log.warning("Failed to process year %s: %s", year, e)
+            continue
+
+    return years
+
+
+def _download_link(download_url_prefix: str, file_entry: EntryProperties) -> str:
+    """ Download link of a delivered file, lstrip returns the path itself when it has no leading slash """
+    return f"{download_url_prefix}{file_entry.path.lstrip('/')}"
+
+
+def _year_period(year: int) -> tuple[datetime, datetime]:
+    """ Start and end date of the delivery period of a year """
+    return datetime(year, 1, 1), datetime(year, 12, 31, 23, 59, 59)
+
+
+def _process_dsm_layers(file_handler: SchemeFileHandler, years: Dict[int, tuple[str, List[EntryProperties]]], download_url_prefix: str, executor: ThreadPoolExecutor) -> Dict[str, List[FeatureWithGeometry]]:
+    """
+    Process DSM layers and return features grouped by layer type.
+
+    Args:
+        file_handler: SchemeFileHandler instance
+        years: Year directories as returned by _list_year_directories
+        download_url_prefix: URL prefix for download links
+        executor: Thread pool used for the directory listings
+
+    Returns:
+        Dictionary mapping DSM layer types to lists of features
+    """
+    features_by_type: defaultdict[str, List[FeatureWithGeometry]] = defaultdict(list)
+
+    # Dynamically discover DSM layer directories of every year
+    layer_uris: Dict[ListingKey, str] = {}
+    for year, (year_uri, year_entries) in years.items():
+        dsm_layer_directories = []
+        for entry in year_entries:
+            if entry.is_directory and entry.name.startswith("dsm"):
+                dsm_layer_directories.append(entry.name)
+
+        log.info(f"Found DSM layer directories for year {year}: {dsm_layer_directories}")
+
+        for layer_name in dsm_layer_directories:
+            layer_uris[(year, layer_name)] = file_handler.navigate(year_uri, f"{layer_name}/laz")
+
+    # List all layers concurrently, the features are created on this thread
+    for (year, layer_name), listing in list_entries_concurrently(executor, file_handler, layer_uris).items():
+        start_date, end_date = _year_period(year)
+
+        try:
+            # Creates the feature collection of the layer if it doesn't exist, also when the layer turns out empty
+            layer_features = features_by_type[layer_name]
+
+            # Extract coordinates from the filenames first, so the geometries of the layer are created at once
+            tiles: List[tuple[EntryProperties, int, int]] = []
+            for file_entry in listing.result():
+                # A literal suffix test is cheaper than a regex filter on the listing, the filename pattern below does the actual check
+                if not file_entry.is_file or not file_entry.name.endswith(".laz"):
                     continue
 
+                coords = _extract_dsm_coordinates_from_filename(file_entry.name)
+                if not coords:
+                    continue
+
+                tiles.append((file_entry, *coords))
+
+            if not tiles:
+                continue
+
+            geometries = _create_dsm_geometries(np.array([tile[1] for tile in tiles]), np.array([tile[2] for tile in tiles]))
+
+            for (file_entry, x, y), geometry in zip(tiles, geometries):
+                # Create bladnr from the coordinates in the filename, DSM_<x>_<y>.laz has 4 digits per coordinate
+                bladnr = f"{x:04d}_{y:04d}"
+
+                # Create feature
+                properties = PdokDeliveryPropertiesBuilding(
+                    bladnr=bladnr,
+                    jaargang_luchtfoto=year,
+                    download_size_bytes=file_entry.size or 0,
+                    download_link=_download_link(download_url_prefix, file_entry),
+                    startdatum=start_date,
+                    einddatum=end_date,
+                )
+
+                feature = FeatureWithGeometry(
+                    geometry=geometry,
+                    properties=properties
+                )
+                layer_features.append(feature)
+
         except Exception as e:
-            log.warning(f"Failed to process year {year}: {e}")
+            log.warning("Failed to process layer %s for year %s: %s", layer_name, year, e)
             continue
 
-    return features_by_type
+    return dict(features_by_type)
 
 
-def _process_3d_layers(file_handler: SchemeFileHandler, source_uri: str, ahn_json_path: Path, download_url_prefix: str) -> Dict[str, List[FeatureWithGeometry]]:
+def _process_3d_layers(file_handler: SchemeFileHandler, years: Dict[int, tuple[str, List[EntryProperties]]], ahn_json_path: Path, download_url_prefix: str, executor: ThreadPoolExecutor) -> Dict[str, List[FeatureWithGeometry]]:
     """
     Process 3D layers and return features grouped by layer type.
 
     Args:
         file_handler: SchemeFileHandler instance
-        source_uri: URI to source directory containing year folders
+        years: Year directories as returned by _list_year_directories
         ahn_json_path: Path to ahn.json file containing tile geometries
         download_url_prefix: URL prefix for download links
+        executor: Thread pool used for the directory listings
 
     Returns:
         Dictionary mapping 3D layer types to lists of features
     """
     # Load AHN geometry data
-    with open(ahn_json_path, 'r') as f:
-        ahn_data = json.load(f)
-        # Convert all keys to lowercase and create geometry objects
-        ahn_geometries: Dict[str, Polygon] = {}
-        for key, bbox in ahn_data.items():
-            # bbox format: [minx, miny, maxx, maxy]
-            ahn_geometry = Polygon([
-                (bbox[0], bbox[1]),  # bottom-left
-                (bbox[2], bbox[1]),  # bottom-right
-                (bbox[2], bbox[3]),  # top-right
-                (bbox[0], bbox[3]),  # top-left
-                (bbox[0], bbox[1])   # close polygon
-            ])
-            ahn_geometries[key.lower()] = ahn_geometry
-
-    # Dynamically discover year directories (directories with numeric names)
-    year_directories = []
-    for entry in file_handler.list_entries_shallow(source_uri):
-        if entry.is_directory and entry.name.isdigit():
-            year_directories.append(int(entry.name))
+    ahn_geometries = load_ahn_geometries(ahn_json_path)
 
-    year_directories.sort()  # Sort years for consistent processing
-    log.info(f"Found year directories: {year_directories}")
+    features_by_type: defaultdict[str, List[FeatureWithGeometry]] = defaultdict(list)
 
-    features_by_type: Dict[str, List[FeatureWithGeometry]] = {}
+    # Dynamically discover the layer directories of every year, must be from 2018 or later
+    layer_uris: Dict[ListingKey, str] = {}
+    for year, (year_uri, year_entries) in years.items():
+        if year < 2018:
+            continue
+
+        layer_directories = []
+        for entry in year_entries:  # only process these layers if discovered.
+            if entry.is_directory and entry.name in _3D_LAYER_NAMES:
+                layer_directories.append(entry.name)
+
+        log.info(f"Found layer directories for year {year}: {layer_directories}")
 
-    # Process each year directory, must be from 2018 or later
-    for year in [x for x in year_directories if x >= 2018]:
-        year_uri = file_handler.navigate(source_uri, str(year))
+        for layer_name in layer_directories:
+            layer_uris[(year, layer_name)] = file_handler.navigate(year_uri, layer_name)
+
+    # List all layers concurrently, the features are created on this thread
+    for (year, layer_name), listing in list_entries_concurrently(executor, file_handler, layer_uris).items():
+        start_date, end_date = _year_period(year)
 
         try:
-            # Check if year directory exists
-            year_entries = list(file_handler.list_entries_shallow(year_uri))
-            if not year_entries:
-                log.warning(f"No entries found in {year_uri}, skipping year {year}")
-                continue
+            # Creates the feature collection of the layer if it doesn't exist, also when the layer turns out empty
+            layer_features = features_by_type[f"basisbestand_{layer_name}"]
+
+            for file_entry in listing.result():
+                if not file_entry.is_file:
+                    continue
+
+                # Extract AHN key and coordinates from filename (handles both old and new formats)
+                ahn_key, coords = _parse_3d_filename(file_entry.name)
+                if not ahn_key:
+                    continue
 
-            # Dynamically discover layer directories
-            layer_directories = []
-            for entry in year_entries:  # only process these layers if discovered.
-                if entry.is_directory and entry.name in ["volledig", "hoogtestatistieken", "gebouwen"]:
-                    layer_directories.append(entry.name)
-
-            log.info(f"Found layer directories for year {year}: {layer_directories}")
-
-            # Process each layer
-            for layer_name in layer_directories:
-                try:
-                    layer_uri = file_handler.navigate(year_uri, layer_name)
-
-                    # Initialize feature collection for this layer if not exists
-                    layer_key = f"basisbestand_{layer_name}"
-                    if layer_key not in features_by_type:
-                        features_by_type[layer_key] = []
-
-                    for file_entry in file_handler.list_entries_shallow(layer_uri):
-                        if not file_entry.is_file:
-                            continue
-
-                        # Extract AHN key from filename (handles both old and new formats)
-                        ahn_key = _extract_ahn_key_from_filename(file_entry.name)
-                        if not ahn_key:
-                            continue
-
-                        # Determine geometry based on filename format
-                        geometry: Optional[Polygon] = None
-                        bladnr: str = ""
-                        # Check if it's the new coordinate-based format
-                        coords = _extract_coordinates_from_new_format(file_entry.name)
-                        if coords:
-                            # New format: create geometry from coordinates (2x2 km tiles)
-                            x, y = coords
-                            geometry = _create_geometry_from_coordinates(x, y, tile_size_meters=2000)
-                            bladnr = f"{x}_{y}"
-                        else:
-                            # Legacy format: use AHN geometries
-                            if ahn_key.lower() in ahn_geometries:
-                                geometry = ahn_geometries[ahn_key.lower()]
-                                bladnr = ahn_key
-
-                        if not geometry:
-                            log.warning(f"Could not determine geometry for file {file_entry.name}")
-                            continue
-
-                        # Create start and end dates
-                        start_date = datetime(year, 1, 1)
-                        end_date = datetime(year, 12, 31, 23, 59, 59)
-
-                        # Construct download link
-                        relative_path = file_entry.path.lstrip('/')
-                        download_link = f"{download_url_prefix}{relative_path}"
-
-                        # Create feature
-                        properties = PdokDeliveryPropertiesBuilding(
-                            bladnr=bladnr,
-                            jaargang_luchtfoto=year,
-                            download_size_bytes=file_entry.size or 0,
-                            download_link=download_link,
-                            startdatum=start_date,
-                            einddatum=end_date,
-                        )
-
-                        feature = FeatureWithGeometry(
-                            geometry=geometry,
-                            properties=properties
-                        )
-                        features_by_type[layer_key].append(feature)
-
-                except Exception as e:
-                    log.warning(f"Failed to process layer {layer_name} for year {year}: {e}")
+                # Determine geometry based on filename format
+                geometry: Optional[Polygon] = None
+                bladnr: str = ""
+                if coords:
+                    # New format: create geometry from coordinates (2x2 km tiles)
+                    x, y = coords
+                    geometry = _create_geometry_from_coordinates(x, y, tile_size_meters=2000)
+                    bladnr = ahn_key
+                else:
+                    # Legacy format: use AHN geometries
+                    geometry = ahn_geometries.get(ahn_key.lower())
+                    bladnr = ahn_key
+
+                if not geometry:
+                    log.warning("Could not determine geometry for file %s", file_entry.name)
                     continue
 
+                # Create feature
+                properties = PdokDeliveryPropertiesBuilding(
+                    bladnr=bladnr,
+                    jaargang_luchtfoto=year,
+                    download_size_bytes=file_entry.size or 0,
+                    download_link=_download_link(download_url_prefix, file_entry),
+                    startdatum=start_date,
+                    einddatum=end_date,
+                )
+
+                feature = FeatureWithGeometry(
+                    geometry=geometry,
+                    properties=properties
+                )
+                layer_features.append(feature)
+
         except Exception as e:
-            log.warning(f"Failed to process year {year}: {e}")
+            log.warning("Failed to process layer %s for year %s: %s", layer_name, year, e)
             continue
 
-    return features_by_type
+    return dict(features_by_type)
 
 
 def get_pdok_building_features(source_uri: str, ahn_json_path: Path, download_url_prefix: str) -> Dict[str, List[FeatureWithGeometry]]:
@@ -369,15 +386,20 @@ def get_pdok_building_features(source_uri: str, ahn_json_path: Path, download_ur
     # Initialize file handler
     file_handler = SchemeFileHandler()
 
-    # Process DSM layers
-    dsm_features = _process_dsm_layers(file_handler, source_uri, download_url_prefix)
+    # One thread pool for all directory listings of this delivery
+    with ThreadPoolExecutor(max_workers=LISTING_WORKERS) as executor:
+        # List the year directories once, they are shared by the DSM and 3D layers
+        years = _list_year_directories(file_handler, source_uri, executor)
 
-    # Log DSM feature counts
-    for layer_key, features in dsm_features.items():
-        log.info(f"DSM layer '{layer_key}': {len(features)} features")
+        # Process DSM layers
+        dsm_features = _process_dsm_layers(file_handler, years, download_url_prefix, executor)
+
+        # Log DSM feature counts
+        for layer_key, features in dsm_features.items():
+            log.info(f"DSM layer '{layer_key}': {len(features)} features")
 
-    # Process 3D layers
-    ahn_3d_features = _process_3d_layers(file_handler, source_uri, ahn_json_path, download_url_prefix)
+        # Process 3D layers
+        ahn_3d_features = _process_3d_layers(file_handler, years, ahn_json_path, download_url_prefix, executor)
 
     # Log 3D feature counts
     for layer_key, features in ahn_3d_features.items():
@@ -386,9 +408,9 @@ def get_pdok_building_features(source_uri: str, ahn_json_path: Path, download_ur
     # Combine results - properly merge dictionaries by combining lists for overlapping keys
     features_by_type: Dict[str, List[FeatureWithGeometry]] = {}
 
-    # Add DSM features
+    # Add DSM features, the lists are owned by this function so they are taken over without copying
     for layer_key, features in dsm_features.items():
-        features_by_type[layer_key] = features.copy()
+        features_by_type[layer_key] = features
 
     # Add 3D features, combining with existing if key already exists
     for layer_key, features in ahn_3d_features.items():
@@ -396,7 +418,7 @@ def get_pdok_building_features(source_uri: str, ahn_json_path: Path, download_ur
             features_by_type[layer_key].extend(features)
             log.info(f"Combined layer '{layer_key}': {len(features_by_type[layer_key])} total features")
         else:
-            features_by_type[layer_key] = features.copy()
+            features_by_type[layer_key] = features
 
     # Log final combined counts
     log.info("Final feature counts per layer:")
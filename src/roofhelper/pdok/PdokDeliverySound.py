@@ -1,24 +1,29 @@
-import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, List
 
-from shapely.geometry import Polygon
-
 from roofhelper.defaultlogging import setup_logging
-from roofhelper.io import EntryProperties, SchemeFileHandler
-from roofhelper.pdok.PdokDelivery import createBaseSchema, PdokDeliveryProperties
+from roofhelper.io import SchemeFileHandler
+from roofhelper.pdok.PdokDelivery import LISTING_WORKERS, createBaseSchema, is_year_name, list_entries_concurrently, load_ahn_geometries, PdokDeliveryProperties
 from roofhelper.pdok.PdokGeopackageWriter import FeatureWithGeometry
 
 log = setup_logging()
 
 PDOK_DELIVERY_SCHEMA_SOUND = createBaseSchema({"bag_peildatum": "int"})
 
+# Filename pattern, compiled once as it is matched against every file in the delivery
+_AHN_KEY_PATTERN = re.compile(r'^([a-zA-Z0-9]+)_.*\.zip$')
+
+# Folder types in /<year>/geluid/<type>/ that are delivered, in layer order
+_FOLDER_TYPES = ('gebouwen', 'tin', 'bodemvlakken')
+_FOLDER_TYPE_SET = frozenset(_FOLDER_TYPES)
+
 
-@dataclass
+@dataclass(slots=True)
 class PdokDeliveryPropertiesSound(PdokDeliveryProperties):
     """Properties for PDOK delivery features."""
     bag_peildatum: int
@@ -35,7 +40,7 @@ def _extract_ahn_key_from_filename(filename: str) -> Optional[str]:
 
     # Pattern to match AHN filenames
     # Expects: <ahn_key>_<anything>.zip
-    match = re.search(r'^([a-zA-Z0-9]+)_.*\.zip$', basename)
+    match = _AHN_KEY_PATTERN.match(basename)
     if not match:
         return None
 
@@ -60,40 +65,49 @@ def get_pdok_sound_features(source_uri: str, ahn_json_path: Path, download_url_p
     file_handler = SchemeFileHandler()
 
     # Load AHN geometry data
-    with open(ahn_json_path, 'r') as f:
-        ahn_data = json.load(f)
-        # Convert all keys to lowercase for consistent matching
-        ahn_geometries = {key.lower(): value for key, value in ahn_data.items()}
-
-    # Expected folder structure: /<year>/geluid/<type>/
-    folder_types = ['gebouwen', 'tin', 'bodemvlakken']
+    ahn_geometries = load_ahn_geometries(ahn_json_path)
 
     # Collect features grouped by folder type
-    features_by_type: Dict[str, List[FeatureWithGeometry]] = {folder_type: [] for folder_type in folder_types}
-
-    for year_entry in (x for x in file_handler.list_entries_shallow(source_uri) if x.is_directory):
-        if not year_entry.name.isdigit() or int(year_entry.name) < 2020:
-            continue
-
-        if list(file_handler.list_entries_shallow(year_entry.full_uri, regex="geluid")) == 0:
-            log.warning(f"No 'geluid' folder found in {year_entry.full_uri}, skipping year {year_entry.name}")
-            continue
-
-        # Check for geluid folder in year directory
-        geluid_uri = file_handler.navigate(year_entry.full_uri, "geluid")
-        layer_entries: list[EntryProperties] = []
-        # Check if all expected folder types exist before processing
-        for folder in file_handler.list_entries_shallow(geluid_uri):
-            if folder.name not in folder_types or not folder.is_directory:
+    features_by_type: Dict[str, List[FeatureWithGeometry]] = {folder_type: [] for folder_type in _FOLDER_TYPES}
+
+    with ThreadPoolExecutor(max_workers=LISTING_WORKERS) as executor:
+        # Check for geluid folder in every year directory
+        geluid_uris: Dict[int, str] = {}
+        for year_entry in (x for x in file_handler.list_entries_shallow(source_uri) if x.is_directory):
+            if not is_year_name(year_entry.name):
                 continue
 
-            layer_entries.append(folder)
+            year = int(year_entry.name)
+            if year < 2020:
+                continue
+
+            geluid_uris[year] = file_handler.navigate(year_entry.full_uri, "geluid")
 
-        # Only process folder types that actually exist
-        for layer in layer_entries:
+        # List the geluid folders concurrently, only process folder types that actually exist
+        layer_uris: Dict[tuple[int, str], str] = {}
+        for year, listing in list_entries_concurrently(executor, file_handler, geluid_uris).items():
             try:
-                for file_entry in (x for x in file_handler.list_entries_shallow(layer.full_uri, regex=r'.*\.zip$') if x.is_file):
-                    year = int(year_entry.name)
+                folders = listing.result()
+            except Exception:
+                log.warning("No 'geluid' folder found in %s, skipping year %s", geluid_uris[year], year)
+                continue
+
+            for folder in folders:
+                if folder.name not in _FOLDER_TYPE_SET or not folder.is_directory:
+                    continue
+
+                layer_uris[(year, folder.name)] = folder.full_uri
+
+        # List the layers concurrently, the features are created on this thread. No regex filter,
+        # the AHN key pattern already only accepts zip files
+        for (year, layer_name), listing in list_entries_concurrently(executor, file_handler, layer_uris).items():
+            # Create start and end dates for the year, shared by all files of the year
+            start_date = datetime(year, 1, 1)
+            end_date = datetime(year, 12, 31, 23, 59, 59)
+            layer_features = features_by_type[layer_name]  # Looked up once per layer, not for every file
+
+            try:
+                for file_entry in (x for x in listing.result() if x.is_file):
                     filename = file_entry.name
 
                     # Extract AHN key from filename
@@ -101,19 +115,8 @@ def get_pdok_sound_features(source_uri: str, ahn_json_path: Path, download_url_p
                     if not ahn_key or ahn_key not in ahn_geometries:
                         continue
 
-                    # Get geometry from AHN data
-                    bbox = ahn_geometries[ahn_key]  # [minx, miny, maxx, maxy]
-                    geometry = Polygon([
-                        (bbox[0], bbox[1]),  # bottom-left
-                        (bbox[2], bbox[1]),  # bottom-right
-                        (bbox[2], bbox[3]),  # top-right
-                        (bbox[0], bbox[3]),  # top-left
-                        (bbox[0], bbox[1])   # close polygon
-                    ])
-
-                    # Create start and end dates for the year
-                    start_date = datetime(year, 1, 1)
-                    end_date = datetime(year, 12, 31, 23, 59, 59)
+                    # Get geometry from AHN data, shared by every file of the tile
+                    geometry = ahn_geometries[ahn_key]
 
                     # Construct download link
                     # Remove leading slash if present to avoid double slashes
@@ -134,9 +137,11 @@ def get_pdok_sound_features(source_uri: str, ahn_json_path: Path, download_url_p
                         geometry=geometry,
                         properties=properties
                     )
-                    features_by_type[layer.name].append(feature)
-            except Exception:
-                continue  # Skip if folder doesn't exist or can't be accessed
+                    layer_features.append(feature)
+            except Exception as e:
+                # Skip if folder doesn't exist or can't be accessed, but make it visible, a failing listing may have retried for a long time
+                log.warning("Could not process folder %s for year %s: %s", layer_name, year, e)
+                continue
 
     # Return the collected features
     return features_by_type
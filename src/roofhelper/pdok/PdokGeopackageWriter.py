@@ -1,10 +1,13 @@
 import os
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List
 
-import fiona
-from shapely.geometry import Polygon, mapping
+import geopandas as gpd
+import numpy as np
+import numpy.typing as npt
+import pyogrio
+from shapely.geometry import Polygon
 
 from roofhelper.defaultlogging import setup_logging
 from roofhelper.io import SchemeFileHandler
@@ -12,14 +15,30 @@ from roofhelper.pdok.PdokDelivery import PdokDeliveryProperties
 
 log = setup_logging()
 
+_schema_dtypes: dict[str, Any] = {'str': object, 'int': 'int64', 'datetime': 'datetime64[ms]'}  # Pandas dtypes for the schema types
 
-@dataclass
+
+@dataclass(slots=True)
 class FeatureWithGeometry:
     """Container for a feature with geometry and properties."""
     geometry: Polygon
     properties: PdokDeliveryProperties
 
 
+def features_to_columns(schema: dict[str, Any], features: List[FeatureWithGeometry]) -> dict[str, npt.NDArray[Any]]:
+    """ Transposes the features of a layer into one numpy array per schema property plus the geometry, so they can be filtered or aggregated without touching every feature """
+    properties = [feature.properties for feature in features]
+    columns = {name: np.array([getattr(feature_properties, name) for feature_properties in properties], dtype=_schema_dtypes[field_type]) for name, field_type in schema['properties'].items()}
+    columns['geometry'] = np.array([feature.geometry for feature in features], dtype=object)
+    return columns
+
+
+def _features_to_dataframe(schema: dict[str, Any], features: List[FeatureWithGeometry]) -> gpd.GeoDataFrame:
+    """ Creates the GeoDataFrame of a layer from its columns, so the layer is written in one go """
+    columns = features_to_columns(schema, features)
+    return gpd.GeoDataFrame({name: columns[name] for name in schema['properties']}, geometry=columns['geometry'], crs="EPSG:28992")
+
+
 def write_features_to_geopackage(
     schema: dict[str, Any],
     features_by_layer: Dict[str, List[FeatureWithGeometry]],
@@ -33,7 +52,7 @@ def write_features_to_geopackage(
         features_by_layer: Dictionary mapping layer names to lists of FeatureWithGeometry objects
         destination: Destination URI for the geopackage file
         file_handler: SchemeFileHandler instance for file operations
-        schema: Fiona schema for the geopackage
+        schema: Schema for the geopackage, the property types map to the column types
     """
     total_features = sum(len(features) for features in features_by_layer.values())
 
@@ -51,18 +70,8 @@ def write_features_to_geopackage(
         # Write each layer
         for layer_name, features in features_by_layer.items():
             if features:  # Only create layer if there are features
-                fiona_features = []
-                for feature in features:
-                    # Convert dataclass to dictionary
-                    properties_dict = asdict(feature.properties)
-                    fiona_feature = {
-                        'geometry': mapping(feature.geometry),
-                        'properties': properties_dict
-                    }
-                    fiona_features.append(fiona_feature)
-
-                with fiona.open(temp_file, 'w', driver='GPKG', schema=schema, crs='EPSG:28992', layer=layer_name) as gpkg:
-                    gpkg.writerecords(fiona_features)
+                # Columnar write, no GeoJSON mapping or properties dict per feature
+                pyogrio.write_dataframe(_features_to_dataframe(schema, features), temp_file, layer=layer_name, driver="GPKG", geometry_type=schema['geometry'])
                 log.info(f"Created layer '{layer_name}' with {len(features)} features")
 
         # Upload temporary file to destination URI using SchemeFileHandler
@@ -1,3 +1,4 @@
+import traceback
 from datetime import datetime
 from pathlib import Path
 import requests
@@ -39,9 +40,8 @@ class PdokS3Uploader:
             # Construct the full URL
             url = f"{self.endpoint}/deliveries/{s3_destination}"
 
-            # Get file size and read file
-            import os
-            file_size = os.path.getsize(geopackage_file)
+            # Get file size
+            file_size = geopackage_file.stat().st_size
 
             # Prepare headers
             headers = {
@@ -79,7 +79,6 @@ class PdokS3Uploader:
             log.error(error_msg)
             log.error(f"Exception type: {type(e).__name__}")
             # Log the full exception for debugging
-            import traceback
             log.error(f"Full traceback: {traceback.format_exc()}")
             return UploadResult(
                 s3_upload_path="",
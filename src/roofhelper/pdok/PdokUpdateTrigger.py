@@ -8,6 +8,11 @@ from roofhelper.pdok.UploadResult import UploadResult
 
 log = setup_logging()
 
+TRIGGER_CONNECT_TIMEOUT = 10  # seconds
+# Generous, because once PDOK has the request it may already act on it. A read timeout does not mean the trigger
+# failed, so it is logged as possibly delivered instead of inviting a retry that delivers it twice
+TRIGGER_READ_TIMEOUT = 300  # seconds
+
 
 class PdokUpdateTrigger:
     """Handles triggering PDOK updates after S3 upload."""
@@ -50,7 +55,8 @@ class PdokUpdateTrigger:
                 'Authorization': f'Bearer {jwt_bearer}'
             }
 
-            response = requests.post(self.url, json=data, headers=headers)
+            # No automatic retries, the trigger is a POST and must not be delivered twice
+            response = requests.post(self.url, json=data, headers=headers, timeout=(TRIGGER_CONNECT_TIMEOUT, TRIGGER_READ_TIMEOUT))
             if response.status_code != 200:
                 log.error(f"Failed to trigger update. Status code: {response.status_code}, Response: {response.text}")
                 return False
@@ -58,6 +64,10 @@ class PdokUpdateTrigger:
             log.info("Successfully triggered PDOK update")
             return True
 
+        except requests.exceptions.ReadTimeout:
+            log.error(f"No response from PDOK within {TRIGGER_READ_TIMEOUT} seconds, the update may still have been triggered. Check PDOK before triggering again")
+            return False
+
         except Exception as e:
             log.error(f"Exception occurred while triggering update: {str(e)}")
             return False
@@ -1,11 +1,18 @@
 import math
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Union
 import numpy as np
 import laspy
 from laspy import LasHeader
+from laspy.lasappender import LasAppender
 from shapely import Polygon
 
+MAX_MEMORY_BYTES = 1 * 1024 * 1024 * 1024  # 1GB for the chunks being split and read ahead
+MAX_OPEN_TILE_WRITERS = 16  # Every open LAZ writer holds a file handle and a buffered compressed chunk
+
 
 def extent_to_polygon(header: LasHeader) -> Polygon:
     # header.mins and header.maxs are already scaled and offset by laspy
@@ -25,49 +32,81 @@ def extent_to_polygon(header: LasHeader) -> Polygon:
 def laz_tile_split(input_laz: Path, output_dir: Path, grid_size: float) -> list[str]:
     os.makedirs(output_dir, exist_ok=True)
 
-    with laspy.open(input_laz) as pointcloud:
-        grid_origin_x = math.floor(pointcloud.header.x_min / grid_size) * grid_size
-        grid_origin_y = math.floor(pointcloud.header.y_min / grid_size) * grid_size
-
-        grid_max_x = math.ceil(pointcloud.header.x_max / grid_size) * grid_size
-        grid_max_y = math.ceil(pointcloud.header.y_max / grid_size) * grid_size
-
-        min_tile_x, max_tile_x = 0, int((grid_max_x - grid_origin_x) / grid_size)
-        min_tile_y, max_tile_y = 0, int((grid_max_y - grid_origin_y) / grid_size)
-
-        generated_tiles = {}
-
-        estimated_point_size = 40 + 10  # point + overhead
-        max_memory_bytes = 1 * 1024 * 1024 * 1024  # 1GB
-        chunk_size = int(max_memory_bytes / estimated_point_size)
-
-        point_batches = pointcloud.chunk_iterator(chunk_size)
-        for point_batch in point_batches:
-            tile_x_idx = ((point_batch.x - grid_origin_x) / grid_size).astype(np.int32)  # type: ignore
-            tile_y_idx = ((point_batch.y - grid_origin_y) / grid_size).astype(np.int32)  # type: ignore
-
-            for tx in range(min_tile_x, max_tile_x):
-                for ty in range(min_tile_y, max_tile_y):
-
-                    mask = (tile_x_idx == tx) & (tile_y_idx == ty)
-                    if not np.any(mask):
-                        continue
-
-                    selected_points = point_batch[mask]
-                    start_x = grid_origin_x + tx * grid_size
-                    start_y = grid_origin_y + ty * grid_size
-
-                    output_filename = f"{Path(input_laz).stem}_{int(start_x)}_{int(start_y)}.laz"
-                    tile_path = os.path.join(output_dir, output_filename)
-
-                    if (tx, ty) not in generated_tiles:
-                        # Create and write header for new tile
-                        with laspy.open(tile_path, mode="w", header=pointcloud.header) as out_writer:
-                            out_writer.write_points(selected_points)  # type: ignore
-                            generated_tiles[(tx, ty)] = str(tile_path)
-                    else:
-                        # Append to existing tile
-                        with laspy.open(tile_path, mode="a") as out_writer:
+    # The most recently used tile writers stay open, so a tile is not reopened for every chunk. The least recently
+    # used writer is closed when the limit is reached and the tile is reopened in append mode when it gets more points
+    tile_writers: OrderedDict[tuple[int, int], Union[laspy.LasWriter, LasAppender]] = OrderedDict()
+    try:
+        with laspy.open(input_laz) as pointcloud:
+            grid_origin_x = math.floor(pointcloud.header.x_min / grid_size) * grid_size
+            grid_origin_y = math.floor(pointcloud.header.y_min / grid_size) * grid_size
+
+            grid_max_x = math.ceil(pointcloud.header.x_max / grid_size) * grid_size
+            grid_max_y = math.ceil(pointcloud.header.y_max / grid_size) * grid_size
+
+            min_tile_x, max_tile_x = 0, int((grid_max_x - grid_origin_x) / grid_size)
+            min_tile_y, max_tile_y = 0, int((grid_max_y - grid_origin_y) / grid_size)
+
+            generated_tiles: dict[tuple[int, int], str] = {}
+
+            estimated_point_size = 40 + 10  # point + overhead
+            chunks_in_flight = 2  # The chunk being split and the chunk being read ahead
+            chunk_size = max(1, int(MAX_MEMORY_BYTES / estimated_point_size / chunks_in_flight))
+
+            # Read the next chunk on a thread while the current one is split and written, the reads and writes
+            # overlap as far as laspy and its LAZ backend release the GIL. Only this thread touches the tile writers
+            point_batches = pointcloud.chunk_iterator(chunk_size)
+            with ThreadPoolExecutor(max_workers=1) as reader:
+                next_batch = reader.submit(next, point_batches, None)
+                while (point_batch := next_batch.result()) is not None:
+                    next_batch = reader.submit(next, point_batches, None)
+
+                    tile_x_idx = ((point_batch.x - grid_origin_x) / grid_size).astype(np.int32)  # type: ignore
+                    tile_y_idx = ((point_batch.y - grid_origin_y) / grid_size).astype(np.int32)  # type: ignore
+
+                    # Group the points by tile with one stable sort instead of a mask per tile, points keep their order within a tile.
+                    # Points on the max edge of the grid fall outside the tile range and are skipped
+                    inside = (tile_x_idx >= min_tile_x) & (tile_x_idx < max_tile_x) & (tile_y_idx >= min_tile_y) & (tile_y_idx < max_tile_y)
+                    inside_idx = np.flatnonzero(inside)
+                    tile_keys = tile_x_idx[inside_idx].astype(np.int64) * max_tile_y + tile_y_idx[inside_idx]
+                    sort_order = np.argsort(tile_keys, kind="stable")
+                    point_order = inside_idx[sort_order]
+                    unique_keys, starts = np.unique(tile_keys[sort_order], return_index=True)
+                    ends = np.append(starts[1:], len(point_order))
+
+                    for tile_key, start, end in zip(unique_keys.tolist(), starts.tolist(), ends.tolist()):
+                        tx, ty = divmod(tile_key, max_tile_y)
+
+                        selected_points = point_batch[point_order[start:end]]
+
+                        out_writer = tile_writers.get((tx, ty))
+                        if out_writer is not None:
+                            tile_writers.move_to_end((tx, ty))
+                        else:
+                            if len(tile_writers) >= MAX_OPEN_TILE_WRITERS:
+                                _, least_recent = tile_writers.popitem(last=False)
+                                least_recent.close()  # Updates the header with the point count
+
+                            tile_path = generated_tiles.get((tx, ty))
+                            if tile_path is None:
+                                start_x = grid_origin_x + tx * grid_size
+                                start_y = grid_origin_y + ty * grid_size
+
+                                output_filename = f"{Path(input_laz).stem}_{int(start_x)}_{int(start_y)}.laz"
+                                tile_path = os.path.join(output_dir, output_filename)
+
+                                # Create and write header for new tile, the header is updated with the point count when the writer closes
+                                out_writer = laspy.open(tile_path, mode="w", header=pointcloud.header)
+                                generated_tiles[(tx, ty)] = tile_path
+                            else:
+                                out_writer = laspy.open(tile_path, mode="a")
+                            tile_writers[(tx, ty)] = out_writer
+
+                        if isinstance(out_writer, LasAppender):
                             out_writer.append_points(selected_points)  # type: ignore
+                        else:
+                            out_writer.write_points(selected_points)  # type: ignore
 
-        return list(generated_tiles.values())
+            return list(generated_tiles.values())
+    finally:
+        for out_writer in tile_writers.values():
+            out_writer.close()
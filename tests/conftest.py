@@ -0,0 +1,29 @@
+"""
+Shared fixtures for the test cases.
+
+This module contains the fixtures used by more than one test module, like
+the helpers that build a PDOK delivery directory on disk.
+"""
+
+import json
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+
+@pytest.fixture
+def create_file() -> Callable[[Path, int], None]:
+    """Returns a helper that writes a file of the given size in bytes, creating its parent directories."""
+    def create(path: Path, size: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"0" * size)
+    return create
+
+
+@pytest.fixture
+def ahn_json(tmp_path: Path) -> Path:
+    """Writes an ahn.json with the bounds of AHN tile 13BN1, as used by the PDOK delivery indexes."""
+    path = tmp_path / "ahn.json"
+    path.write_text(json.dumps({"13BN1": [120000, 487500, 125000, 493750]}))
+    return path
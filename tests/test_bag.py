@@ -0,0 +1,247 @@
+"""
+Test cases for the BAG extraction.
+
+This module contains test cases for the year filter of the LVBAG panden
+and for writing the filtered panden to a geopackage.
+"""
+
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+import pyogrio
+import pytest
+import shapely
+from shapely.geometry import Polygon, box
+
+pytest.importorskip("osgeo")  # bag.py reads the LVBAG with GDAL
+
+from roofhelper.kadaster import bag  # noqa: E402
+
+REFERENCE_DATE = np.datetime64("2022-12-31", "D")
+
+
+def _feature(identificatie: str, **fields: Any) -> dict[str, Any]:
+    """A pand as read from the LVBAG, registered and valid since 2020 unless overridden."""
+    feature: dict[str, Any] = {name: None for name in bag._bag_read_properties}
+    feature.update(
+        identificatie=identificatie,
+        status="Pand in gebruik",
+        tijdstipRegistratieLV="2020/01/01",
+        beginGeldigheid="2020/01/01",
+        geometry=box(0, 0, 10, 10),
+    )
+    feature.update(fields)
+    return feature
+
+
+class TestFilterBatchByYear:
+    """Test cases for _filter_batch_by_year."""
+
+    def test_nothing_selected(self) -> None:
+        """Test that a batch without selected panden gives empty columns instead of failing."""
+        columns = bag._filter_batch_by_year([_feature("gesloopt", status="Pand gesloopt")], REFERENCE_DATE)
+
+        assert list(columns) == [*bag._bag_read_properties, "force_low_lod", "geometry"]
+        assert all(len(column) == 0 for column in columns.values())
+        assert len(bag._columns_to_dataframe(columns)) == 0
+
+    @staticmethod
+    def _selected(*features: dict[str, Any]) -> list[str]:
+        return list(bag._filter_batch_by_year(list(features), REFERENCE_DATE)["identificatie"])
+
+    def test_missing_end_dates(self) -> None:
+        """Test that a missing or empty eindGeldigheid counts as still valid."""
+        assert self._selected(_feature("none", eindGeldigheid=None), _feature("empty", eindGeldigheid="")) == ["none", "empty"]
+
+    def test_end_of_validity(self) -> None:
+        """Test that panden are only selected when still valid at the reference date, or when valid for zero time."""
+        assert self._selected(
+            _feature("ended", eindGeldigheid="2021/06/01"),
+            _feature("ends_later", eindGeldigheid="2023/01/01"),
+            _feature("zero_time", beginGeldigheid="2021/06/01", eindGeldigheid="2021/06/01"),
+        ) == ["ends_later", "zero_time"]
+
+    def test_excluded_statuses(self) -> None:
+        """Test that panden with an excluded or missing status are never selected."""
+        excluded = [_feature(f"excluded_{i}", status=status) for i, status in enumerate(bag.BAG_EXCLUDED_STATUSES)]
+
+        assert self._selected(*excluded, _feature("in_gebruik")) == ["in_gebruik"]
+
+    def test_registration_dates(self) -> None:
+        """Test that panden registered, valid or inactive relative to the reference date are filtered."""
+        assert self._selected(
+            _feature("registered_later", tijdstipRegistratieLV="2023/01/01"),
+            _feature("valid_later", beginGeldigheid="2023/01/01"),
+            _feature("inactive", tijdstipInactiefLV="2022/06/01"),
+            _feature("inactive_later", tijdstipInactiefLV="2023/01/01"),
+            _feature("not_bag", tijdstipNietBagLV="2021/01/01"),
+            _feature("registration_ended_later", tijdstipEindRegistratieLV="2023/01/01 12:00:00"),
+        ) == ["inactive_later", "registration_ended_later"]
+
+    def test_date_fallback(self) -> None:
+        """Test that dates not in the YYYY/MM/DD form are parsed one by one, invalid optional dates count as missing."""
+        assert self._selected(
+            _feature("not_padded", beginGeldigheid="2020/1/5"),
+            _feature("unknown_inactive", tijdstipInactiefLV="onbekend"),
+        ) == ["not_padded", "unknown_inactive"]
+
+        # Alone in their column, so only the YYYY/MM/DD check keeps numpy from parsing them
+        assert self._selected(_feature("year_inactive", tijdstipInactiefLV="2020")) == ["year_inactive"]
+        assert self._selected(_feature("invalid_inactive", tijdstipInactiefLV="2020/13/01")) == ["invalid_inactive"]
+
+    @pytest.mark.parametrize("date", ["onbekend", "2020", "2020/13/01", ""])
+    def test_invalid_required_date(self, date: str) -> None:
+        """Test that an invalid or empty required date raises instead of dropping the pand."""
+        with pytest.raises(ValueError):
+            self._selected(_feature("valid"), _feature("invalid", tijdstipRegistratieLV=date))
+
+    def test_missing_required_date(self) -> None:
+        """Test that a missing required date raises instead of dropping the pand."""
+        with pytest.raises(TypeError):
+            self._selected(_feature("valid"), _feature("missing", beginGeldigheid=None))
+
+    def test_columns(self) -> None:
+        """Test that the selected panden are transposed into typed schema columns."""
+        columns = bag._filter_batch_by_year([_feature("a", voorkomenIdentificatie=1), _feature("b", status="Pand gesloopt"), _feature("c")], REFERENCE_DATE)
+        dataframe = bag._columns_to_dataframe(columns)
+
+        assert list(dataframe.columns) == [*bag._bag_schema["properties"], "geometry"]
+        assert dataframe["identificatie"].tolist() == ["a", "c"]
+        assert dataframe["voorkomenIdentificatie"].dtype == "Int64"
+        assert dataframe["voorkomenIdentificatie"].isna().tolist() == [False, True]
+        assert not dataframe["force_low_lod"].any()
+        assert dataframe.geometry[0].equals(box(0, 0, 10, 10))
+        assert dataframe.crs == "EPSG:28992"
+
+
+def _rings_with_spike() -> list[list[tuple[float, float]]]:
+    """A square with a spike below 0.1 square millimeter, starting at every vertex in both directions."""
+    ring = [(0.5, -1.0), (0.5001, 0.0), (10.0, 0.0), (10.0, 10.0), (0.0, 10.0), (0.0, 0.0), (0.5, 0.0)]
+    rotations = [ring[i:] + ring[:i] for i in range(len(ring))]
+    return rotations + [rotation[::-1] for rotation in rotations]
+
+
+class TestSimplifyGeometries:
+    """Test cases for _simplify_geometries, which only buffers the invalid geometries."""
+
+    @pytest.mark.parametrize("ring", _rings_with_spike())
+    def test_valid_like_buffer(self, ring: list[tuple[float, float]]) -> None:
+        """Test that a valid pand, with a spike near the start vertex, gets the same coordinates as with buffer(0) on every pand."""
+        polygon = Polygon(ring)
+        expected = bag.remove_spikes(shapely.buffer(shapely.simplify(polygon, tolerance=0.05, preserve_topology=True), 0))
+
+        simplified = bag._simplify_geometries(np.array([polygon], dtype=object))
+
+        assert polygon.is_valid
+        assert shapely.to_wkb(bag.remove_spikes(simplified[0])) == shapely.to_wkb(expected)
+
+    def test_hole_and_invalid(self) -> None:
+        """Test that a pand with a hole keeps its orientation like buffer(0) and an invalid pand is still repaired."""
+        with_hole = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)], [[(2, 2), (2, 4), (4, 4), (4, 2)]])
+        bowtie = Polygon([(0, 0), (10, 10), (10, 0), (0, 10)])
+        geometries = np.array([with_hole, bowtie], dtype=object)
+
+        simplified = bag._simplify_geometries(geometries)
+        expected = shapely.buffer(shapely.simplify(geometries, tolerance=0.05, preserve_topology=True), 0)
+
+        assert shapely.to_wkb(simplified).tolist() == shapely.to_wkb(expected).tolist()
+        assert shapely.is_valid(simplified).all()
+
+
+class TestExtractByYear:
+    """Test cases for extract_by_year with a fake LVBAG reader, covering the reader thread and the queue."""
+
+    def setup_method(self) -> None:
+        """Set up test fixtures before each test method."""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.target = self.test_dir / "bag_2022.gpkg"
+        self.read_count = 0
+
+    def teardown_method(self) -> None:
+        """Clean up test fixtures after each test method."""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _reader(self, features: list[dict[str, Any]], fail_after: Optional[int] = None) -> Callable[[Path], Iterator[dict[str, Any]]]:
+        """Replacement for bag_zip_read that yields the features, optionally failing after fail_after features."""
+        def bag_zip_read(source: Path) -> Iterator[dict[str, Any]]:
+            for feature in features:
+                if self.read_count == fail_after:
+                    raise RuntimeError("read failed")
+                self.read_count += 1
+                yield feature
+        return bag_zip_read
+
+    def _extract(self) -> None:
+        """Runs extract_by_year on a separate thread, so a deadlock fails the test instead of hanging it."""
+        errors: list[BaseException] = []
+
+        def run() -> None:
+            try:
+                bag.extract_by_year(self.test_dir / "lvbag.zip", self.target, 2022)
+            except BaseException as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=60)
+        assert not thread.is_alive(), "extract_by_year did not finish"
+        if errors:
+            raise errors[0]
+
+    def test_batches(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that the selected panden of every batch end up in the gpkg, in reading order."""
+        features = [_feature(f"pand_{i}", status="Pand gesloopt" if i % 4 == 0 else "Pand in gebruik") for i in range(10)]
+        monkeypatch.setattr(bag, "bag_zip_read", self._reader(features))
+        monkeypatch.setattr(bag, "BATCH_SIZE", 3)
+        monkeypatch.setattr(bag, "QUEUE_SIZE", 1)
+
+        self._extract()
+
+        written = pyogrio.read_dataframe(self.target)
+        assert written["identificatie"].tolist() == [f"pand_{i}" for i in range(10) if i % 4 != 0]
+        assert pyogrio.read_info(self.target)["geometry_type"] == "Polygon"
+
+    def test_nothing_selected(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that an empty gpkg with the bag schema is written when no pand passes the filter."""
+        monkeypatch.setattr(bag, "bag_zip_read", self._reader([_feature("gesloopt", status="Pand gesloopt")]))
+
+        self._extract()
+
+        info = pyogrio.read_info(self.target)
+        assert info["features"] == 0
+        assert info["fields"].tolist() == list(bag._bag_schema["properties"])
+
+    def test_reader_failure(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that an error of the reader thread reaches the caller after the batches before it were written."""
+        monkeypatch.setattr(bag, "bag_zip_read", self._reader([_feature(f"pand_{i}") for i in range(10)], fail_after=7))
+        monkeypatch.setattr(bag, "BATCH_SIZE", 3)
+        monkeypatch.setattr(bag, "QUEUE_SIZE", 1)
+
+        with pytest.raises(RuntimeError, match="read failed"):
+            self._extract()
+
+    def test_writer_failure(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a write error reaches the caller and stops the reader, which is blocked on the full queue."""
+        monkeypatch.setattr(bag, "bag_zip_read", self._reader([_feature(f"pand_{i}") for i in range(100)]))
+        monkeypatch.setattr(bag, "BATCH_SIZE", 1)
+        monkeypatch.setattr(bag, "QUEUE_SIZE", 1)
+
+        columns_to_dataframe = bag._columns_to_dataframe
+        written_batches: list[dict[str, Any]] = []
+
+        def failing_columns_to_dataframe(columns: dict[str, Any]) -> Any:
+            if len(written_batches) == 2:
+                raise RuntimeError("write failed")
+            written_batches.append(columns)
+            return columns_to_dataframe(columns)
+
+        monkeypatch.setattr(bag, "_columns_to_dataframe", failing_columns_to_dataframe)
+
+        with pytest.raises(RuntimeError, match="write failed"):
+            self._extract()
+
+        assert self.read_count < 100  # The reader stopped instead of reading the whole LVBAG
@@ -154,6 +154,17 @@ class TestFileSchemeFileHandler:
         assert "nested" in names
         assert "nested.md" in names
 
+    def test_list_entries_recursive_relative_paths(self) -> None:
+        """Test that recursive listing reports paths relative to the base URI and the correct entry types."""
+        entries = {entry.path: entry for entry in FileSchemeFileHandler.list_entries_recursive(self.test_uri)}
+
+        assert entries["subdir"].is_directory
+        assert entries["subdir/nested"].is_directory
+        assert entries["subdir/nested"].size is None
+        assert entries["subdir/sub2.py"].is_file
+        assert entries["subdir/nested/nested.md"].is_file
+        assert entries["subdir/nested/nested.md"].full_uri == f"file://{self.nested_dir / 'nested.md'}"
+
     def test_list_entries_recursive_with_regex(self) -> None:
         """Test recursive listing with regex filter."""
         # Filter for Python files
@@ -0,0 +1,83 @@
+"""
+Test cases for the grid_create_on_intersecting_centroid function.
+
+This module contains test cases for the creation of the roofer tile grid
+based on the centroids of the building footprints.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Polygon, box
+
+from roofhelper.kadaster import geo
+from roofhelper.kadaster.geo import centroid_in_extent, grid_create_on_intersecting_centroid
+
+
+class TestGridCreateOnIntersectingCentroid:
+    """Test cases for grid_create_on_intersecting_centroid function."""
+
+    def setup_method(self) -> None:
+        """Create a footprint geopackage with buildings spread over a few grid cells."""
+        self.test_dir = tempfile.mkdtemp()
+        self.footprints = Path(self.test_dir) / "footprints.gpkg"
+
+        geometries = [
+            box(100010, 400010, 100020, 400020),  # cell (100000, 400000)
+            box(100500, 400500, 100520, 400520),  # cell (100000, 400000)
+            box(102010, 400010, 102020, 400020),  # cell (102000, 400000)
+            box(101990, 401990, 102030, 402030),  # overlaps 4 cells, centroid in cell (102000, 402000)
+        ]
+        gpd.GeoDataFrame({"identificatie": [str(i) for i in range(len(geometries))]}, geometry=geometries, crs="EPSG:28992").to_file(self.footprints, driver="GPKG")
+
+    def teardown_method(self) -> None:
+        """Clean up test fixtures after each test method."""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_cells_with_centroids(self) -> None:
+        """Test that only cells containing a centroid are returned, ordered by x and then y."""
+        cells = list(grid_create_on_intersecting_centroid(self.footprints, 2000))
+
+        assert cells == [
+            (100000.0, 400000.0, 102000.0, 402000.0),
+            (102000.0, 400000.0, 104000.0, 402000.0),
+            (102000.0, 402000.0, 104000.0, 404000.0),
+        ]
+
+    def test_cells_read_in_multiple_chunks(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that reading the footprints in chunks gives the same grid."""
+        expected = list(grid_create_on_intersecting_centroid(self.footprints, 2000))
+
+        monkeypatch.setattr(geo, "CENTROID_CHUNK_SIZE", 1)
+        assert list(grid_create_on_intersecting_centroid(self.footprints, 2000)) == expected
+
+    def test_chunks_follow_the_fids(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that chunks continue after the last FID, with gaps in the FIDs and a custom FID column, and a shapefile without FID column."""
+        expected = list(grid_create_on_intersecting_centroid(self.footprints, 2000))
+        footprints = gpd.read_file(self.footprints)
+
+        custom_fid = Path(self.test_dir) / "custom_fid.gpkg"
+        footprints.assign(pand_fid=[1, 2, 103, 104]).to_file(custom_fid, driver="GPKG", layer_options={"FID": "pand_fid"})
+
+        shapefile = Path(self.test_dir) / "footprints.shp"
+        footprints[["geometry"]].to_file(shapefile)
+
+        monkeypatch.setattr(geo, "CENTROID_CHUNK_SIZE", 1)
+        assert list(grid_create_on_intersecting_centroid(custom_fid, 2000)) == expected
+        assert list(grid_create_on_intersecting_centroid(shapefile, 2000)) == expected
+
+    def test_centroid_in_extent(self) -> None:
+        """Test that the centroid test agrees with the grid cells, including centroids on a cell border."""
+        geometries = np.array([
+            box(100010, 400010, 100020, 400020),  # inside
+            box(101990, 401990, 102030, 402030),  # overlaps the cell, centroid outside
+            box(101990, 400010, 102010, 400020),  # centroid on the max x border, belongs to the next cell
+            box(99990, 400010, 100010, 400020),  # centroid on the min x border
+            Polygon(),  # empty geometry has no centroid
+        ], dtype=object)
+
+        assert centroid_in_extent(geometries, (100000, 400000, 102000, 402000)).tolist() == [True, False, False, True, False]
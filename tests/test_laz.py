@@ -0,0 +1,116 @@
+"""
+Test cases for splitting a pointcloud into tiles.
+
+This module contains test cases for laz_tile_split, comparing the tiles
+against a straightforward mask per tile over the whole pointcloud.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import laspy
+import numpy as np
+import pytest
+
+from roofhelper.pointcloud import laz
+
+pytestmark = pytest.mark.skipif(not laspy.LazBackend.detect_available(), reason="writing the LAZ tiles needs lazrs or laszip")
+
+GRID_SIZE = 500.0
+POINT_COUNT = 5000
+
+
+class TestLazTileSplit:
+    """Test cases for laz_tile_split."""
+
+    def setup_method(self) -> None:
+        """Write a synthetic pointcloud with points on the edges of the grid."""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.input_laz = self.test_dir / "input.laz"
+
+        rng = np.random.default_rng(0)
+        header = laspy.LasHeader(point_format=3, version="1.2")
+        header.scales = np.array([0.01, 0.01, 0.01])
+        header.offsets = np.array([0, 0, 0])
+        pointcloud = laspy.LasData(header)
+        x = rng.uniform(120000, 123000, POINT_COUNT)
+        y = rng.uniform(480000, 482500, POINT_COUNT)
+        x[:3] = 123000.0  # On the max edge of the grid, outside every tile
+        y[3:6] = 480000.0  # On the min edge of the grid, inside the first row of tiles
+        pointcloud.x = x
+        pointcloud.y = y
+        pointcloud.z = rng.uniform(0, 50, POINT_COUNT)
+        pointcloud.intensity = np.arange(POINT_COUNT)
+        pointcloud.write(self.input_laz)
+
+    def teardown_method(self) -> None:
+        """Clean up test fixtures after each test method."""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _reference_tiles(self) -> dict[str, np.ndarray]:
+        """The points of every tile, selected with a mask per tile over the whole pointcloud."""
+        pointcloud = laspy.read(self.input_laz)
+        tile_x = np.floor((pointcloud.x - 120000) / GRID_SIZE).astype(np.int32)
+        tile_y = np.floor((pointcloud.y - 480000) / GRID_SIZE).astype(np.int32)
+
+        tiles = {}
+        for tx in range(6):
+            for ty in range(5):
+                mask = (tile_x == tx) & (tile_y == ty)
+                if mask.any():
+                    tiles[f"input_{120000 + tx * 500}_{480000 + ty * 500}.laz"] = pointcloud.points.array[mask]
+        return tiles
+
+    def _assert_matches_reference(self, tiles: list[str]) -> None:
+        reference = self._reference_tiles()
+        assert sorted(Path(tile).name for tile in tiles) == sorted(reference)
+
+        for tile in tiles:
+            points = laspy.read(tile)
+            expected = reference[Path(tile).name]
+            assert points.header.point_count == len(expected)
+            assert np.array_equal(points.points.array, expected)
+            assert np.allclose(points.header.mins, [points.x.min(), points.y.min(), points.z.min()])
+            assert np.allclose(points.header.maxs, [points.x.max(), points.y.max(), points.z.max()])
+
+        assert sum(len(points) for points in reference.values()) == POINT_COUNT - 3
+
+    def test_single_chunk(self) -> None:
+        """Test that a pointcloud read in one chunk is split like the reference."""
+        tiles = laz.laz_tile_split(self.input_laz, self.test_dir / "tiles", GRID_SIZE)
+
+        self._assert_matches_reference(tiles)
+
+    def test_chunks_and_reopened_tiles(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that tiles split over many chunks, and closed and reopened in between, match the reference."""
+        monkeypatch.setattr(laz, "MAX_MEMORY_BYTES", 997 * 50 * 2)  # Chunks of 997 points
+        monkeypatch.setattr(laz, "MAX_OPEN_TILE_WRITERS", 3)
+
+        open_writers = 0
+        max_open_writers = 0
+        laspy_open = laspy.open
+
+        def counting_open(source: Any, mode: str = "r", **kwargs: Any) -> Any:
+            nonlocal open_writers, max_open_writers
+            opened = laspy_open(source, mode=mode, **kwargs)
+            if mode in ("w", "a"):
+                open_writers += 1
+                max_open_writers = max(max_open_writers, open_writers)
+                close = opened.close
+
+                def counting_close() -> None:
+                    nonlocal open_writers
+                    open_writers -= 1
+                    close()
+                opened.close = counting_close
+            return opened
+
+        monkeypatch.setattr(laspy, "open", counting_open)
+
+        tiles = laz.laz_tile_split(self.input_laz, self.test_dir / "tiles", GRID_SIZE)
+
+        assert max_open_writers == 3
+        assert open_writers == 0
+        self._assert_matches_reference(tiles)
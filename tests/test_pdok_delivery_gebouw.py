@@ -0,0 +1,123 @@
+"""
+Test cases for the PDOK building delivery index.
+
+This module contains test cases for the filename parsing and the feature
+creation of the PDOK building delivery (DSM and 3D layers).
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from roofhelper.pdok.PdokDelivery import is_year_name
+from roofhelper.pdok.PdokDeliveryGebouw import (_create_dsm_geometry,
+                                                _extract_ahn_key_from_filename,
+                                                _extract_coordinates_from_new_format,
+                                                _extract_dsm_coordinates_from_filename,
+                                                _parse_3d_filename,
+                                                get_pdok_building_features)
+
+
+class TestFilenameParsing:
+    """Test cases for the filename parsing functions."""
+
+    def test_extract_dsm_coordinates(self) -> None:
+        """Test DSM filenames with and without a prefix."""
+        assert _extract_dsm_coordinates_from_filename("DSM_1234_5678.laz") == (1234, 5678)
+        assert _extract_dsm_coordinates_from_filename("2022/dsm/laz/prefix_DSM_1234_5678.laz") == (1234, 5678)
+        assert _extract_dsm_coordinates_from_filename("DSM_123_5678.laz") is None
+        assert _extract_dsm_coordinates_from_filename("DSM_1234_5678.las") is None
+
+    def test_is_year_name(self) -> None:
+        """Test that only four ASCII digits are a year directory."""
+        assert is_year_name("2022")
+        assert not is_year_name("20221")
+        assert not is_year_name("dsm_05m")
+        assert not is_year_name("202²")
+
+    def test_extract_ahn_key_legacy_format(self) -> None:
+        """Test that the legacy format returns the AHN key."""
+        assert _extract_ahn_key_from_filename("13bn1_something.zip") == "13bn1"
+        assert _extract_ahn_key_from_filename("13BN1_something.zip") == "13BN1"
+        assert _extract_ahn_key_from_filename("something.zip") is None
+        assert _extract_ahn_key_from_filename("x13bn1_a_25ez2_b.zip") == "25ez2"
+        assert _extract_ahn_key_from_filename("13bn_1_something.zip") is None
+
+    def test_extract_ahn_key_new_format(self) -> None:
+        """Test that the new format returns the coordinates as key."""
+        assert _extract_coordinates_from_new_format("gebouwen_2021_123_456.zip") == (123, 456)
+        assert _extract_ahn_key_from_filename("gebouwen_2021_123_456.zip") == "123_456"
+        assert _extract_coordinates_from_new_format("13bn1_something.zip") is None
+
+    def test_parse_3d_filename(self) -> None:
+        """Test that the coordinates are only returned for the new format."""
+        assert _parse_3d_filename("2023/volledig/volledig_2023_120000_480000.zip") == ("120000_480000", (120000, 480000))
+        assert _parse_3d_filename("13BN1_something.zip") == ("13BN1", None)
+        assert _parse_3d_filename("something.zip") == (None, None)
+
+    def test_create_dsm_geometry_offset(self) -> None:
+        """Test that tiles on the 2 and 7 hundreds are shifted by 50 meters."""
+        assert _create_dsm_geometry(1220, 5670).bounds == (122000, 567000, 122250, 567250)
+        assert _create_dsm_geometry(1222, 5677).bounds == (122250, 567750, 122500, 568000)
+
+
+class TestGetPdokBuildingFeatures:
+    """Test cases for get_pdok_building_features on a local delivery directory."""
+
+    @pytest.fixture(autouse=True)
+    def delivery(self, tmp_path: Path, create_file: Callable[[Path, int], None], ahn_json: Path) -> None:
+        """Create a delivery directory with DSM and 3D layers."""
+        root = tmp_path / "delivery"
+
+        create_file(root / "2022" / "dsm_05m" / "laz" / "DSM_1222_4567.laz", 10)
+        create_file(root / "2022" / "dsm_05m" / "laz" / "readme.txt", 1)
+        create_file(root / "2017" / "gebouwen" / "13bn1_2017.zip", 2)  # Too old for the 3D layers
+        create_file(root / "2022" / "gebouwen" / "13bn1_2022.zip", 20)
+        create_file(root / "2022" / "gebouwen" / "99zz9_2022.zip", 20)  # Unknown AHN key
+        create_file(root / "2023" / "volledig" / "volledig_2023_120000_480000.zip", 30)
+        create_file(root / "2023" / "other" / "13bn1_2023.zip", 1)  # Not a delivered layer
+
+        self.ahn_json = ahn_json
+        self.source_uri = f"file://{root}"
+
+    def test_layers(self) -> None:
+        """Test that the features are grouped per layer."""
+        features = get_pdok_building_features(self.source_uri, self.ahn_json, "https://example.com/")
+
+        assert {layer: len(layer_features) for layer, layer_features in features.items()} == {
+            "dsm_05m": 1,
+            "basisbestand_gebouwen": 1,
+            "basisbestand_volledig": 1,
+        }
+
+    def test_dsm_feature(self) -> None:
+        """Test the properties of a DSM feature."""
+        feature = get_pdok_building_features(self.source_uri, self.ahn_json, "https://example.com/")["dsm_05m"][0]
+
+        assert feature.geometry.bounds == (122250, 456750, 122500, 457000)
+        assert feature.properties.bladnr == "1222_4567"
+        assert feature.properties.jaargang_luchtfoto == 2022
+        assert feature.properties.download_size_bytes == 10
+        assert feature.properties.download_link.startswith("https://example.com/")
+        assert feature.properties.download_link.endswith("DSM_1222_4567.laz")
+        assert feature.properties.startdatum == datetime(2022, 1, 1)
+        assert feature.properties.einddatum == datetime(2022, 12, 31, 23, 59, 59)
+
+    def test_3d_features(self) -> None:
+        """Test the properties of the legacy and new format 3D features."""
+        features = get_pdok_building_features(self.source_uri, self.ahn_json, "https://example.com/")
+
+        legacy = features["basisbestand_gebouwen"][0]
+        assert legacy.geometry.bounds == (120000, 487500, 125000, 493750)
+        assert legacy.properties.bladnr == "13bn1"
+        assert legacy.properties.jaargang_luchtfoto == 2022
+        assert legacy.properties.download_size_bytes == 20
+        assert legacy.properties.download_link.endswith("13bn1_2022.zip")
+
+        new_format = features["basisbestand_volledig"][0]
+        assert new_format.geometry.bounds == (120000, 480000, 122000, 482000)
+        assert new_format.properties.bladnr == "120000_480000"
+        assert new_format.properties.jaargang_luchtfoto == 2023
+        assert new_format.properties.startdatum == datetime(2023, 1, 1)
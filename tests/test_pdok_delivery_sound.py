@@ -0,0 +1,62 @@
+"""
+Test cases for the PDOK sound delivery index.
+
+This module contains test cases for the filename parsing and the feature
+creation of the PDOK sound delivery.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from roofhelper.pdok.PdokDeliverySound import _extract_ahn_key_from_filename, get_pdok_sound_features
+
+
+class TestGetPdokSoundFeatures:
+    """Test cases for get_pdok_sound_features on a local delivery directory."""
+
+    @pytest.fixture(autouse=True)
+    def delivery(self, tmp_path: Path, create_file: Callable[[Path, int], None], ahn_json: Path) -> None:
+        """Create a delivery directory with sound layers."""
+        root = tmp_path / "delivery"
+
+        create_file(root / "2021" / "geluid" / "gebouwen" / "13bn1_gebouwen.zip", 10)
+        create_file(root / "2021" / "geluid" / "gebouwen" / "99zz9_gebouwen.zip", 10)  # Unknown AHN key
+        create_file(root / "2021" / "geluid" / "tin" / "13BN1_tin.zip", 20)
+        create_file(root / "2021" / "geluid" / "other" / "13bn1_other.zip", 1)  # Not a delivered folder type
+        create_file(root / "2019" / "geluid" / "gebouwen" / "13bn1_gebouwen.zip", 1)  # Too old
+        create_file(root / "2022" / "readme.txt", 1)  # No geluid folder
+
+        self.ahn_json = ahn_json
+        self.source_uri = f"file://{root}"
+
+    def test_extract_ahn_key(self) -> None:
+        """Test that the AHN key is lowercased and only returned for zip files."""
+        assert _extract_ahn_key_from_filename("geluid/gebouwen/13BN1_gebouwen.zip") == "13bn1"
+        assert _extract_ahn_key_from_filename("13bn1_gebouwen.laz") is None
+
+    def test_layers(self) -> None:
+        """Test that the features are grouped per folder type and years without a geluid folder are skipped."""
+        features = get_pdok_sound_features(self.source_uri, self.ahn_json, "https://example.com/")
+
+        assert {layer: len(layer_features) for layer, layer_features in features.items()} == {
+            "gebouwen": 1,
+            "tin": 1,
+            "bodemvlakken": 0,
+        }
+
+    def test_feature(self) -> None:
+        """Test the properties of a sound feature."""
+        feature = get_pdok_sound_features(self.source_uri, self.ahn_json, "https://example.com/")["gebouwen"][0]
+
+        assert feature.geometry.bounds == (120000, 487500, 125000, 493750)
+        assert feature.properties.bladnr == "13bn1"
+        assert feature.properties.bag_peildatum == 2021
+        assert feature.properties.download_size_bytes == 10
+        assert feature.properties.download_link.startswith("https://example.com/")
+        assert feature.properties.download_link.endswith("13bn1_gebouwen.zip")
+        assert "geluid/" not in feature.properties.download_link
+        assert feature.properties.startdatum == datetime(2021, 1, 1)
+        assert feature.properties.einddatum == datetime(2021, 12, 31, 23, 59, 59)
@@ -0,0 +1,84 @@
+"""
+Test cases for the PDOK geopackage writer.
+
+This module contains test cases for writing the delivery features per layer
+to a geopackage.
+"""
+
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pyogrio
+from shapely.geometry import box
+
+from roofhelper.pdok.PdokDeliveryGebouw import PDOK_DELIVERY_SCHEMA_GEBOUW, PdokDeliveryPropertiesBuilding
+from roofhelper.pdok.PdokGeopackageWriter import FeatureWithGeometry, features_to_columns, write_features_to_geopackage
+
+
+class TestWriteFeaturesToGeopackage:
+    """Test cases for write_features_to_geopackage function."""
+
+    def setup_method(self) -> None:
+        """Set up test fixtures before each test method."""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.destination = self.test_dir / "index.gpkg"
+
+    def teardown_method(self) -> None:
+        """Clean up test fixtures after each test method."""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    @staticmethod
+    def _feature(bladnr: str, size: int) -> FeatureWithGeometry:
+        return FeatureWithGeometry(
+            geometry=box(120000, 480000, 122000, 482000),
+            properties=PdokDeliveryPropertiesBuilding(
+                bladnr=bladnr,
+                download_size_bytes=size,
+                download_link=f"https://example.com/{bladnr}.zip",
+                startdatum=datetime(2022, 1, 1),
+                einddatum=datetime(2022, 12, 31, 23, 59, 59),
+                jaargang_luchtfoto=2022,
+            ),
+        )
+
+    def test_layers(self) -> None:
+        """Test that every layer with features is written with the schema columns."""
+        features = {
+            "dsm_05m": [self._feature("1222_4567", 10), self._feature("1222_4568", 5 * 1024 ** 3)],
+            "basisbestand_gebouwen": [self._feature("13bn1", 20)],
+            "basisbestand_volledig": [],
+        }
+        write_features_to_geopackage(PDOK_DELIVERY_SCHEMA_GEBOUW, features, f"file://{self.destination}", self.test_dir)
+
+        assert pyogrio.list_layers(self.destination)[:, 0].tolist() == ["dsm_05m", "basisbestand_gebouwen"]
+
+        info = pyogrio.read_info(self.destination, layer="dsm_05m")
+        assert info["crs"] == "EPSG:28992"
+        assert info["geometry_type"] == "Polygon"
+        assert info["fields"].tolist() == list(PDOK_DELIVERY_SCHEMA_GEBOUW["properties"])
+
+        written = pyogrio.read_dataframe(self.destination, layer="dsm_05m")
+        assert written["bladnr"].tolist() == ["1222_4567", "1222_4568"]
+        assert written["download_size_bytes"].tolist() == [10, 5 * 1024 ** 3]
+        assert written["einddatum"][0] == datetime(2022, 12, 31, 23, 59, 59)
+        assert written.geometry[0].bounds == (120000, 480000, 122000, 482000)
+
+    def test_no_features(self) -> None:
+        """Test that no geopackage is created without features."""
+        write_features_to_geopackage(PDOK_DELIVERY_SCHEMA_GEBOUW, {"dsm_05m": []}, f"file://{self.destination}", self.test_dir)
+
+        assert not self.destination.exists()
+
+    def test_features_to_columns(self) -> None:
+        """Test that every schema property becomes a typed array next to the geometries."""
+        columns = features_to_columns(PDOK_DELIVERY_SCHEMA_GEBOUW, [self._feature("1222_4567", 10), self._feature("1222_4568", 20)])
+
+        assert list(columns) == [*PDOK_DELIVERY_SCHEMA_GEBOUW["properties"], "geometry"]
+        assert columns["download_size_bytes"].dtype == np.int64
+        assert columns["download_size_bytes"].sum() == 30
+        assert columns["startdatum"].dtype == np.dtype("datetime64[ms]")
+        assert columns["bladnr"].tolist() == ["1222_4567", "1222_4568"]
+        assert columns["geometry"][1].bounds == (120000, 480000, 122000, 482000)
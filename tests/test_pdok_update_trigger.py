@@ -0,0 +1,93 @@
+"""
+Test cases for the PDOK update trigger.
+
+This module contains test cases for the request the update trigger posts,
+including the signed JWT bearer token.
+"""
+
+import base64
+from datetime import datetime, timezone
+from typing import Any
+
+import jwt
+import pytest
+import requests
+
+from roofhelper.pdok.PdokUpdateTrigger import TRIGGER_CONNECT_TIMEOUT, TRIGGER_READ_TIMEOUT, PdokUpdateTrigger
+from roofhelper.pdok.UploadResult import UploadResult
+
+serialization = pytest.importorskip("cryptography.hazmat.primitives.serialization")
+rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+
+
+class FakeResponse:
+    """Response of the fake trigger endpoint."""
+
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.text = "error" if status_code != 200 else ""
+
+
+class TestTriggerUpdate:
+    """Test cases for trigger_update with a fake trigger endpoint."""
+
+    def setup_method(self) -> None:
+        """Create a trigger with a freshly generated RSA key."""
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = self.private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+        self.trigger = PdokUpdateTrigger("https://example.com/trigger", base64.b64encode(pem).decode())
+        self.upload_result = UploadResult("3dbag/rel20250101", "s3://bucket/3dbag", "20250101", True)
+        self.posted: list[dict[str, Any]] = []
+        self.status_code = 200
+
+    def _post(self, url: str, **kwargs: Any) -> FakeResponse:
+        """Replacement for requests.post that records the request."""
+        self.posted.append({"url": url, **kwargs})
+        return FakeResponse(self.status_code)
+
+    def test_every_trigger_is_signed(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that every trigger posts the upload path with a bearer token signed with the private key."""
+        monkeypatch.setattr(requests, "post", self._post)
+
+        assert self.trigger.trigger_update(self.upload_result)
+        assert self.trigger.trigger_update(self.upload_result)
+
+        assert len(self.posted) == 2
+        for request in self.posted:
+            assert request["url"] == "https://example.com/trigger"
+            assert request["json"]["params"]["key"] == "3dbag/rel20250101"
+            assert request["timeout"] == (TRIGGER_CONNECT_TIMEOUT, TRIGGER_READ_TIMEOUT)
+
+            scheme, token = request["headers"]["Authorization"].split(" ")
+            claims = jwt.decode(token, self.private_key.public_key(), algorithms=["RS256"])
+            assert scheme == "Bearer"
+            assert claims["iss"] == "3dbasisvoorziening"
+            assert claims["exp"] > datetime.now(timezone.utc).timestamp()
+
+    def test_failed_upload(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that nothing is posted when the upload failed."""
+        monkeypatch.setattr(requests, "post", self._post)
+        self.upload_result.success = False
+
+        assert not self.trigger.trigger_update(self.upload_result)
+        assert self.posted == []
+
+    def test_rejected_trigger(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test that a trigger rejected by PDOK is reported as failed."""
+        monkeypatch.setattr(requests, "post", self._post)
+        self.status_code = 401
+
+        assert not self.trigger.trigger_update(self.upload_result)
+        assert len(self.posted) == 1
+
+    def test_read_timeout(self, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture) -> None:
+        """Test that a trigger without a response in time is reported as failed and possibly delivered."""
+        def timed_out_post(url: str, **kwargs: Any) -> FakeResponse:
+            self._post(url, **kwargs)
+            raise requests.exceptions.ReadTimeout()
+
+        monkeypatch.setattr(requests, "post", timed_out_post)
+
+        assert not self.trigger.trigger_update(self.upload_result)
+        assert len(self.posted) == 1
+        assert "may still have been triggered" in caplog.text
@@ -3,6 +3,8 @@ import shutil
 import tempfile
 from pathlib import Path
 
+import pytest
+
 from roofhelper.io import SchemeFileHandler
 from roofhelper.io.FileHandle import FileHandle
 
@@ -143,3 +145,37 @@ class TestSchemeFileHandlerPathComparison:
         for handle in self.scheme_handler.file_handles:
             assert handle.path.is_absolute()
             assert handle.path == handle.path.resolve()
+
+
+class TestSchemeFileHandlerListing:
+    """Test cases for the glob filtering of SchemeFileHandler listings."""
+
+    def setup_method(self) -> None:
+        """Set up a small directory tree with mixed file types."""
+        self.test_dir = tempfile.mkdtemp()
+        self.test_uri = f"file://{self.test_dir}"
+        self.scheme_handler = SchemeFileHandler()
+
+        nested_dir = Path(self.test_dir) / "tile_dir"
+        nested_dir.mkdir()
+        for path in [Path(self.test_dir) / "a.laz", Path(self.test_dir) / "b.LAS", Path(self.test_dir) / "c.gpkg", nested_dir / "d.laz", nested_dir / "e.txt"]:
+            path.write_text("content")
+
+    def teardown_method(self) -> None:
+        """Clean up test fixtures after each test method."""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_list_entries_shallow_include_globs(self) -> None:
+        """Test that multiple globs are combined and matched against the entry name."""
+        entries = self.scheme_handler.list_entries_shallow(self.test_uri, include_globs=["*.laz", "*.LAS"])
+        assert {entry.name for entry in entries} == {"a.laz", "b.LAS"}
+
+    def test_list_entries_recursive_include_globs(self) -> None:
+        """Test that globs do not match on parent directory names."""
+        entries = self.scheme_handler.list_entries_recursive(self.test_uri, include_globs=["*.laz", "tile*"])
+        assert {entry.path for entry in entries} == {"a.laz", "tile_dir", os.path.join("tile_dir", "d.laz")}
+
+    def test_list_entries_regex_and_globs_are_exclusive(self) -> None:
+        """Test that combining a regex with globs is rejected."""
+        with pytest.raises(ValueError):
+            self.scheme_handler.list_entries_shallow(self.test_uri, regex=".*", include_globs=["*.laz"])